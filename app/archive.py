@@ -0,0 +1,129 @@
+"""Archiv-Tier: verschiebt lange abgelaufene und gekündigte Lizenzen nach ``licenses_archive``.
+
+Läuft periodisch im App-Prozess (``ARCHIVE_INTERVAL_HOURS``, 0 = aus) oder per Cron::
+
+    python -m app.archive
+
+Verschoben wird in Chunks, jeder Chunk ist eine eigene Transaktion (INSERT ... SELECT
+und DELETE per ID-Liste), damit lange Sperren auf ``licenses`` vermieden werden.
+"""
+import logging
+import os
+import threading
+from datetime import date, datetime
+
+from sqlalchemy import delete, literal, select
+
+from . import events, versions
+from .database import engine
+from .models import ArchivedLicense, License
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_AFTER_MONTHS = int(os.getenv("ARCHIVE_AFTER_MONTHS", "12"))
+ARCHIVE_CHUNK_SIZE = int(os.getenv("ARCHIVE_CHUNK_SIZE", "1000"))
+ARCHIVE_INTERVAL_HOURS = float(os.getenv("ARCHIVE_INTERVAL_HOURS", "24"))
+
+ARCHIVED_STATUSES = ("expired", "cancelled")
+
+COLUMNS = [
+    "id", "customer_id", "product_id", "license_key", "seats", "start_date",
+    "end_date", "interval", "price", "status", "notes",
+]
+
+
+def archive_cutoff(today: date, months: int = ARCHIVE_AFTER_MONTHS) -> date:
+    """``today`` minus ``months`` Monate, der Tag wird auf das Monatsende begrenzt."""
+    month_index = today.year * 12 + today.month - 1 - months
+    year, month = divmod(month_index, 12)
+    month += 1
+    for day in (today.day, 30, 29, 28):
+        try:
+            return date(year, month, day)
+        except ValueError:
+            continue
+    raise ValueError("ungültiges Datum")
+
+
+def run_archive(today: date | None = None, chunk_size: int = ARCHIVE_CHUNK_SIZE) -> int:
+    """Verschiebt alle fälligen Lizenzen und liefert deren Anzahl."""
+    cutoff = archive_cutoff(today or date.today())
+    licenses = License.__table__
+    archive = ArchivedLicense.__table__
+    moved = 0
+
+    while True:
+        with engine.begin() as conn:
+            ids = conn.execute(
+                select(licenses.c.id)
+                .where(
+                    licenses.c.status.in_(ARCHIVED_STATUSES),
+                    licenses.c.end_date != None,
+                    licenses.c.end_date < cutoff,
+                )
+                .order_by(licenses.c.id)
+                .limit(chunk_size)
+            ).scalars().all()
+            if not ids:
+                break
+
+            source = select(
+                *(licenses.c[name] for name in COLUMNS),
+                literal(datetime.utcnow()).label("archived_at"),
+            ).where(licenses.c.id.in_(ids))
+            conn.execute(archive.insert().from_select(COLUMNS + ["archived_at"], source))
+            conn.execute(delete(licenses).where(licenses.c.id.in_(ids)))
+
+        moved += len(ids)
+        # Core-Statements laufen an den Session-Events vorbei
+        versions.bump("licenses", "licenses_archive")
+        # aus Sicht der Standardansichten sind archivierte Lizenzen gelöscht
+        events.broker.publish([{"entity": "license", "id": i, "action": "deleted"} for i in ids])
+
+    if moved:
+        logger.info("%d Lizenzen archiviert (Stichtag %s)", moved, cutoff)
+    return moved
+
+
+class ArchiveScheduler:
+    """Startet ``run_archive`` in festen Abständen in einem Hintergrund-Thread.
+
+    Weitere Wartungsjobs (z.B. abgelaufene Sessions löschen) laufen über ``jobs`` mit.
+    """
+
+    def __init__(self, interval_hours: float = ARCHIVE_INTERVAL_HOURS):
+        self.interval = interval_hours * 3600
+        self.jobs = [run_archive]
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self):
+        if self.interval <= 0 or self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="archive", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join(timeout=30)
+        self._thread = None
+
+    def _run(self):
+        while not self._stop.is_set():
+            for job in self.jobs:
+                try:
+                    job()
+                except Exception:
+                    logger.exception("Wartungsjob %s fehlgeschlagen", job.__name__)
+            self._stop.wait(self.interval)
+
+
+scheduler = ArchiveScheduler()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    print(f"{run_archive()} Lizenzen archiviert")
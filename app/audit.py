@@ -0,0 +1,238 @@
+"""Audit-Trail: erfasst Änderungen über Session-Events und schreibt sie im Hintergrund.
+
+Die Diffs werden beim Flush berechnet, erst nach einem erfolgreichen Commit in eine
+begrenzte Queue gelegt und von einem Writer-Thread gebündelt in ``audit_log`` geschrieben.
+So kostet ein Formular-Post keinen zusätzlichen Roundtrip zur Datenbank.
+"""
+import json
+import logging
+import os
+import queue
+import threading
+from datetime import date, datetime
+
+from sqlalchemy import event, inspect
+
+from .database import SessionLocal, engine
+from .models import AuditLog, Customer, License, Product, User
+
+logger = logging.getLogger(__name__)
+
+AUDIT_QUEUE_SIZE = int(os.getenv("AUDIT_QUEUE_SIZE", "10000"))
+AUDIT_BATCH_SIZE = int(os.getenv("AUDIT_BATCH_SIZE", "500"))
+
+# Welche Modelle protokolliert werden und unter welchem Namen
+AUDITED_MODELS = {
+    License: "license",
+    Customer: "customer",
+    Product: "product",
+    User: "user",
+}
+
+# Felder, deren Inhalt nicht im Protokoll landen darf
+MASKED_FIELDS = {"password_hash"}
+
+_STOP = object()
+
+
+def _to_json_value(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return value
+
+
+def _masked(key: str, value):
+    if key in MASKED_FIELDS and value is not None:
+        return "***"
+    return _to_json_value(value)
+
+
+def _column_keys(obj):
+    return [attr.key for attr in inspect(type(obj)).column_attrs]
+
+
+def _diff(obj, action: str) -> dict:
+    """Liefert {feld: [vorher, nachher]} für das Objekt."""
+    changes = {}
+    if action == "create":
+        for key in _column_keys(obj):
+            value = getattr(obj, key)
+            if value is not None:
+                changes[key] = [None, _masked(key, value)]
+    elif action == "delete":
+        for key in _column_keys(obj):
+            value = getattr(obj, key)
+            if value is not None:
+                changes[key] = [_masked(key, value), None]
+    else:
+        state = inspect(obj)
+        for key in _column_keys(obj):
+            hist = state.attrs[key].history
+            if not hist.has_changes():
+                continue
+            before = hist.deleted[0] if hist.deleted else None
+            after = hist.added[0] if hist.added else None
+            if before == after:
+                continue
+            changes[key] = [_masked(key, before), _masked(key, after)]
+    return changes
+
+
+def _entry(session, obj, action: str):
+    entity_type = AUDITED_MODELS.get(type(obj))
+    if entity_type is None:
+        return None
+
+    changes = _diff(obj, action)
+    if action == "update" and not changes:
+        return None
+
+    user_id, username = session.info.get("audit_user", (None, None))
+    return {
+        "created_at": datetime.utcnow(),
+        "user_id": user_id,
+        "username": username,
+        "entity_type": entity_type,
+        "entity_id": obj.id,
+        "action": action,
+        "changes": json.dumps(changes, ensure_ascii=False),
+    }
+
+
+def record_bulk_create(session, entity_type: str, rows: list[dict]):
+    """Protokolliert per Bulk-Insert angelegte Zeilen (nach dem Commit aufrufen).
+
+    Bulk-Inserts laufen am Flush vorbei, ``rows`` müssen die vergebenen IDs enthalten.
+    """
+    user_id, username = session.info.get("audit_user", (None, None))
+    now = datetime.utcnow()
+    writer.submit([
+        {
+            "created_at": now,
+            "user_id": user_id,
+            "username": username,
+            "entity_type": entity_type,
+            "entity_id": row["id"],
+            "action": "create",
+            "changes": json.dumps(
+                {key: [None, _masked(key, value)] for key, value in row.items() if key != "id" and value is not None},
+                ensure_ascii=False,
+            ),
+        }
+        for row in rows
+    ])
+
+
+@event.listens_for(SessionLocal, "after_flush")
+def _collect_changes(session, flush_context):
+    # Im after_flush sind IDs vergeben, new/dirty/deleted und die Attribut-Historie
+    # zeigen aber noch den Stand vor dem Flush.
+    pending = session.info.setdefault("audit_pending", [])
+    for action, objs in (
+        ("create", session.new),
+        ("update", session.dirty),
+        ("delete", session.deleted),
+    ):
+        for obj in objs:
+            entry = _entry(session, obj, action)
+            if entry is not None:
+                pending.append(entry)
+
+
+@event.listens_for(SessionLocal, "after_commit")
+def _enqueue_changes(session):
+    pending = session.info.pop("audit_pending", None)
+    if pending:
+        writer.submit(pending)
+
+
+@event.listens_for(SessionLocal, "after_rollback")
+def _discard_changes(session):
+    session.info.pop("audit_pending", None)
+
+
+class AuditWriter:
+    """Hintergrund-Thread, der Audit-Einträge aus einer begrenzten Queue gebündelt schreibt."""
+
+    def __init__(self, maxsize: int = AUDIT_QUEUE_SIZE, batch_size: int = AUDIT_BATCH_SIZE):
+        self.batch_size = batch_size
+        self._queue: queue.Queue = queue.Queue(maxsize=maxsize)
+        self._thread: threading.Thread | None = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if self.running:
+            return
+        self._thread = threading.Thread(target=self._run, name="audit-writer", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 10.0):
+        """Leert die Queue vollständig und beendet den Thread."""
+        thread = self._thread
+        if thread is None:
+            return
+        self._queue.put(_STOP)
+        thread.join(timeout)
+        self._thread = None
+
+    def submit(self, entries: list[dict]):
+        if not self.running:
+            self._write(entries)
+            return
+
+        overflow = []
+        for entry in entries:
+            try:
+                self._queue.put_nowait(entry)
+            except queue.Full:
+                overflow.append(entry)
+
+        # Queue voll: lieber im Request synchron schreiben als Einträge verlieren
+        if overflow:
+            logger.warning("Audit-Queue voll, schreibe %d Einträge synchron", len(overflow))
+            self._write(overflow)
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            stop = item is _STOP
+            batch = [] if stop else [item]
+
+            while not stop and len(batch) < self.batch_size:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stop = True
+                else:
+                    batch.append(item)
+
+            if batch:
+                self._write(batch)
+            if stop:
+                # nach dem Sentinel eingereihte Einträge noch mitnehmen
+                rest = []
+                while True:
+                    try:
+                        item = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if item is not _STOP:
+                        rest.append(item)
+                if rest:
+                    self._write(rest)
+                return
+
+    def _write(self, entries: list[dict]):
+        try:
+            with engine.begin() as conn:
+                conn.execute(AuditLog.__table__.insert(), entries)
+        except Exception:
+            logger.exception("Audit-Einträge konnten nicht geschrieben werden (%d)", len(entries))
+
+
+writer = AuditWriter()
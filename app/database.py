@@ -1,6 +1,6 @@
 import os
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session, sessionmaker, declarative_base
 
 DATABASE_URL = os.getenv("DATABASE_URL")
 
@@ -8,11 +8,74 @@ if not DATABASE_URL:
     # Fallback für lokalen Start ohne Docker (optional)
     DATABASE_URL = "sqlite:///./dev.db"
 
-engine = create_engine(
-    DATABASE_URL,
+# Getunter SQLite-Betrieb für kleine Installationen ohne Postgres:
+# WAL (Leser warten nicht auf Schreiber), ein serialisierter Writer, Reader-Pool.
+SQLITE_TUNED = os.getenv("SQLITE_TUNED", "0") == "1"
+SQLITE_READERS = int(os.getenv("SQLITE_READERS", "8"))
+SQLITE_MMAP_MB = int(os.getenv("SQLITE_MMAP_MB", "256"))
+SQLITE_CACHE_MB = int(os.getenv("SQLITE_CACHE_MB", "64"))
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+
+TUNED = SQLITE_TUNED and DATABASE_URL.startswith("sqlite") and ":memory:" not in DATABASE_URL
+
+
+def _sqlite_pragmas(read_only: bool):
+    def on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+        cursor.execute("PRAGMA journal_mode=WAL")
+        # in WAL sicher: ein Stromausfall kann nur die letzten Commits kosten, nie die Datei
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_MB * 1024 * 1024}")
+        cursor.execute(f"PRAGMA cache_size=-{SQLITE_CACHE_MB * 1024}")  # negativ = KiB
+        if read_only:
+            cursor.execute("PRAGMA query_only=ON")
+        cursor.close()
+    return on_connect
+
+
+if TUNED:
+    # Schreiber: genau eine Verbindung, parallele Schreibzugriffe warten im Pool statt
+    # sich gegenseitig mit SQLITE_BUSY abzuweisen.
+    engine = create_engine(DATABASE_URL, future=True, pool_size=1, max_overflow=0, pool_timeout=30)
+    read_engine = create_engine(DATABASE_URL, future=True, pool_size=SQLITE_READERS, max_overflow=0)
+    event.listen(engine, "connect", _sqlite_pragmas(read_only=False))
+    event.listen(read_engine, "connect", _sqlite_pragmas(read_only=True))
+else:
+    engine = create_engine(
+        DATABASE_URL,
+        future=True,
+    )
+    read_engine = engine
+
+
+class RoutingSession(Session):
+    """Liest über ``read_engine``, schreibt über ``engine``.
+
+    Ab dem ersten Schreibzugriff bleibt die Transaktion beim Writer, damit sie ihre
+    eigenen, noch nicht committeten Änderungen sieht.
+    """
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        if self.info.get("use_writer") or self._flushing or (clause is not None and clause.is_dml):
+            self.info["use_writer"] = True
+            return engine
+        return read_engine
+
+
+SessionLocal = sessionmaker(
+    autocommit=False,
+    autoflush=False,
+    bind=engine,
     future=True,
+    class_=RoutingSession if TUNED else Session,
 )
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine, future=True)
+
+@event.listens_for(SessionLocal, "after_transaction_end")
+def _reset_writer(session, transaction):
+    if transaction.parent is None:
+        session.info.pop("use_writer", None)
+
 
 Base = declarative_base()
@@ -6,7 +6,7 @@ from sqlalchemy.orm import Session
 
 from .database import SessionLocal
 from .models import User
-from .security import SESSION_IDLE_MINUTES, SESSION_MAX_HOURS
+from .security import SESSION_IDLE_MINUTES, SESSION_MAX_HOURS, SESSION_TOUCH_SECONDS
 
 
 def get_db():
@@ -36,20 +36,23 @@ def get_current_user(request: Request, db: Session = Depends(get_db)) -> User:
             raise HTTPException(status_code=303, headers={"Location": "/login"})
 
     # Inaktivitäts-Timeout
-    if last_seen_str:
-        last_seen = datetime.fromisoformat(last_seen_str)
-        if now - last_seen > timedelta(minutes=SESSION_IDLE_MINUTES):
-            request.session.clear()
-            raise HTTPException(status_code=303, headers={"Location": "/login"})
+    last_seen = datetime.fromisoformat(last_seen_str) if last_seen_str else None
+    if last_seen and now - last_seen > timedelta(minutes=SESSION_IDLE_MINUTES):
+        request.session.clear()
+        raise HTTPException(status_code=303, headers={"Location": "/login"})
 
-    # last_seen aktualisieren
-    request.session["last_seen"] = now.isoformat()
+    # last_seen nur gelegentlich aktualisieren, jede Änderung kostet einen Schreibzugriff im Store
+    if not last_seen or now - last_seen > timedelta(seconds=SESSION_TOUCH_SECONDS):
+        request.session["last_seen"] = now.isoformat()
 
     user = db.query(User).filter(User.id == user_id, User.is_active == 1).first()
     if not user:
         request.session.clear()
         raise HTTPException(status_code=303, headers={"Location": "/login"})
 
+    # für den Audit-Trail: wer ändert in dieser DB-Session
+    db.info["audit_user"] = (user.id, user.username)
+
     return user
 
 
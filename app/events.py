@@ -0,0 +1,180 @@
+"""Live-Updates per Server-Sent Events.
+
+Commits, die Lizenzen oder Kunden ändern, landen über Session-Events beim Broker.
+Der sammelt sie kurz (``EVENT_DEBOUNCE_SECONDS``), löst in einer einzigen Abfrage die
+Kunden-/Produktnamen auf, berechnet die Dashboard-Kennzahlen einmal und verteilt das
+Ergebnis an alle verbundenen Clients.
+"""
+import asyncio
+import logging
+import threading
+from collections import Counter
+from datetime import date
+
+from sqlalchemy import event, inspect
+from starlette.concurrency import run_in_threadpool
+
+from .database import SessionLocal
+from .models import Customer, License, Product
+from .stats import dashboard_stats
+
+logger = logging.getLogger(__name__)
+
+EVENT_DEBOUNCE_SECONDS = 0.5
+SUBSCRIBER_QUEUE_SIZE = 100
+# größere Batches (Bulk-Vergabe, Archivlauf) gehen als ein einziges "reload" raus
+MAX_LICENSE_MESSAGES = 50
+
+LICENSE_FIELDS = ("customer_id", "product_id", "license_key", "seats", "start_date", "end_date", "status")
+
+
+def _json_value(value):
+    return value.isoformat() if isinstance(value, date) else value
+
+
+class EventBroker:
+    def __init__(self):
+        self._subscribers: set[asyncio.Queue] = set()
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._pending: dict = {}
+        self._scheduled = False
+        self._lock = threading.Lock()
+
+    def subscribe(self) -> asyncio.Queue:
+        self._loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self._subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        self._subscribers.discard(queue)
+
+    def close(self):
+        """Beendet alle offenen Streams (Shutdown)."""
+        for queue in list(self._subscribers):
+            self._offer(queue, None)
+        self._subscribers.clear()
+
+    def publish(self, changes: list[dict]):
+        """Thread-sicher, wird nach jedem Commit aufgerufen."""
+        loop = self._loop
+        if not changes or not self._subscribers or loop is None or loop.is_closed():
+            return
+        with self._lock:
+            for change in changes:
+                # mehrere Änderungen an derselben Entität: die letzte gewinnt
+                self._pending[(change["entity"], change.get("id"))] = change
+            if self._scheduled:
+                return
+            self._scheduled = True
+        loop.call_soon_threadsafe(lambda: loop.create_task(self._flush()))
+
+    async def _flush(self):
+        await asyncio.sleep(EVENT_DEBOUNCE_SECONDS)
+        with self._lock:
+            changes = list(self._pending.values())
+            self._pending.clear()
+            self._scheduled = False
+        if not self._subscribers:
+            return
+
+        try:
+            messages = await run_in_threadpool(self._build_messages, changes)
+        except Exception:
+            logger.exception("Live-Update konnte nicht berechnet werden")
+            return
+
+        for queue in list(self._subscribers):
+            for message in messages:
+                if not self._offer(queue, message):
+                    self._drop(queue)
+                    break
+
+    def _drop(self, queue: asyncio.Queue):
+        """Client kommt nicht hinterher: Queue leeren und Stream beenden, er verbindet sich neu."""
+        self._subscribers.discard(queue)
+        while not queue.empty():
+            queue.get_nowait()
+        queue.put_nowait(None)
+
+    @staticmethod
+    def _offer(queue: asyncio.Queue, message) -> bool:
+        try:
+            queue.put_nowait(message)
+            return True
+        except asyncio.QueueFull:
+            return False
+
+    def _build_messages(self, changes: list[dict]) -> list[tuple[str, dict]]:
+        license_changes = [c for c in changes if c["entity"] == "license"]
+        if len(license_changes) > MAX_LICENSE_MESSAGES:
+            with SessionLocal() as db:
+                stats = dashboard_stats(db)
+            return [("reload", dict(Counter(c["action"] for c in license_changes))), ("stats", stats)]
+
+        customer_ids = {c["customer_id"] for c in license_changes if c.get("customer_id")}
+        product_ids = {c["product_id"] for c in license_changes if c.get("product_id")}
+
+        with SessionLocal() as db:
+            customer_names = dict(
+                db.query(Customer.id, Customer.name).filter(Customer.id.in_(customer_ids))
+            ) if customer_ids else {}
+            product_names = dict(
+                db.query(Product.id, Product.name).filter(Product.id.in_(product_ids))
+            ) if product_ids else {}
+            stats = dashboard_stats(db)
+
+        messages = []
+        for change in license_changes:
+            payload = dict(change)
+            payload.pop("entity")
+            if change["action"] != "deleted":
+                payload["customer_name"] = customer_names.get(change.get("customer_id"))
+                payload["product_name"] = product_names.get(change.get("product_id"))
+            messages.append(("license", payload))
+        messages.append(("stats", stats))
+        return messages
+
+
+broker = EventBroker()
+
+
+def license_change(values: dict, action: str) -> dict:
+    """Wie ``_license_change``, aber aus Spaltenwerten (für Bulk-Inserts ohne ORM-Objekte)."""
+    change = {"entity": "license", "id": values["id"], "action": action}
+    for field in LICENSE_FIELDS:
+        change[field] = _json_value(values.get(field))
+    return change
+
+
+def _license_change(obj: License, action: str) -> dict:
+    change = {"entity": "license", "id": obj.id, "action": action}
+    if action != "deleted":
+        state = inspect(obj)
+        for field in LICENSE_FIELDS:
+            change[field] = _json_value(state.attrs[field].value)
+    return change
+
+
+@event.listens_for(SessionLocal, "after_flush")
+def _collect_events(session, flush_context):
+    pending = session.info.setdefault("live_events", [])
+    for action, objs in (("created", session.new), ("updated", session.dirty), ("deleted", session.deleted)):
+        for obj in objs:
+            if isinstance(obj, License):
+                pending.append(_license_change(obj, action))
+            elif isinstance(obj, Customer):
+                # ändert nur die Kennzahlen
+                pending.append({"entity": "customer", "id": obj.id, "action": action})
+
+
+@event.listens_for(SessionLocal, "after_commit")
+def _publish_events(session):
+    pending = session.info.pop("live_events", None)
+    if pending:
+        broker.publish(pending)
+
+
+@event.listens_for(SessionLocal, "after_rollback")
+def _discard_events(session):
+    session.info.pop("live_events", None)
@@ -0,0 +1,126 @@
+"""Facetten-Zähler für die Lizenzliste.
+
+Alle Facetten kommen aus einer einzigen UNION-ALL-Abfrage. Jeder Zweig wendet die
+aktuellen Filter an, außer dem der eigenen Dimension, damit z.B. bei ``status=active``
+trotzdem die Zahlen für die anderen Status sichtbar bleiben. Mit "inkl. Archiv" zählt
+jeder Zweig auch ``licenses_archive`` mit, wie die Liste selbst. Ergebnisse werden pro
+Filter-Signatur und Datenstand gecacht.
+"""
+from datetime import date, timedelta
+
+from sqlalchemy import String, case, cast, func, literal, null, select, union_all
+from sqlalchemy.orm import Session
+
+from .filters import LicenseFilters, apply_license_filters
+from .models import Customer, Product
+from .result_cache import ResultCache
+
+TOP_N = 10
+
+cache = ResultCache("facets", ("licenses", "licenses_archive", "customers", "products"), max_entries=256)
+
+
+def _rows(filters: LicenseFilters, today: date, skip: str, columns):
+    """Gefilterte, ungruppierte Zeilen aller gelesenen Tiers; ``columns(model)`` liefert die Spalten."""
+    selects = [
+        apply_license_filters(
+            select(*columns(model))
+            .select_from(model)
+            .join(Customer, model.customer_id == Customer.id)
+            .join(Product, model.product_id == Product.id),
+            filters, today, skip=skip, model=model,
+        )
+        for model in filters.license_models()
+    ]
+    stmt = selects[0] if len(selects) == 1 else union_all(*selects)
+    return stmt.subquery()
+
+
+def _expiry_bucket(model, today: date):
+    # disjunkte Buckets, die kumulierten Werte (30 ⊂ 60 ⊂ 90) bildet facet_counts()
+    return case(
+        (model.end_date == None, "none"),
+        (model.end_date < today, "expired"),
+        (model.end_date <= today + timedelta(days=30), "30"),
+        (model.end_date <= today + timedelta(days=60), "60"),
+        (model.end_date <= today + timedelta(days=90), "90"),
+        else_="later",
+    )
+
+
+def _facet_query(filters: LicenseFilters, today: date):
+    n = func.count().label("n")
+
+    def grouped(facet, column):
+        rows = _rows(filters, today, facet, lambda model: [column(model).label("key")])
+        return select(
+            literal(facet).label("facet"),
+            rows.c.key,
+            cast(null(), String).label("label"),
+            n,
+        ).group_by(rows.c.key)
+
+    def top(skip, id_column, name_column):
+        rows = _rows(
+            filters, today, skip,
+            lambda model: [id_column(model).label("key"), name_column.label("label")],
+        )
+        count = func.count()
+        sub = (
+            select(rows.c.key, rows.c.label, count.label("n"))
+            .group_by(rows.c.key, rows.c.label)
+            .order_by(count.desc())
+            .limit(TOP_N)
+            .subquery()
+        )
+        return select(
+            literal(skip).label("facet"),
+            cast(sub.c.key, String).label("key"),
+            sub.c.label,
+            sub.c.n,
+        )
+
+    return union_all(
+        grouped("status", lambda model: cast(model.status, String)),
+        grouped("expiring", lambda model: _expiry_bucket(model, today)),
+        top("customer", lambda model: model.customer_id, Customer.name),
+        top("product", lambda model: model.product_id, Product.name),
+    )
+
+
+def _compute(db: Session, filters: LicenseFilters, today: date) -> dict:
+    result = {"status": {}, "expiring": {}, "customers": [], "products": []}
+    buckets = {}
+
+    for facet, key, label, n in db.execute(_facet_query(filters, today)):
+        if facet == "status":
+            if key:
+                result["status"][key] = n
+        elif facet == "expiring":
+            buckets[key] = n
+        elif facet == "customer":
+            result["customers"].append({"id": int(key), "name": label, "count": n})
+        else:
+            result["products"].append({"id": int(key), "name": label, "count": n})
+
+    running = 0
+    for key in ("30", "60", "90"):
+        running += buckets.get(key, 0)
+        result["expiring"][key] = running
+    result["expiring"]["expired"] = buckets.get("expired", 0)
+
+    result["customers"].sort(key=lambda f: -f["count"])
+    result["products"].sort(key=lambda f: -f["count"])
+    return result
+
+
+def facet_counts(db: Session, filters: LicenseFilters, today: date | None = None) -> dict:
+    today = today or date.today()
+    key = (filters.signature(), today)
+    version = cache.version()
+
+    result = cache.get(key, version)
+    if result is None:
+        result = _compute(db, filters, today)
+        cache.put(key, version, result)
+    return result
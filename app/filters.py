@@ -0,0 +1,103 @@
+"""Filter der Lizenzliste: einmal normalisiert, für Liste, Facetten und Caches nutzbar."""
+from dataclasses import dataclass
+from datetime import date, timedelta
+
+from sqlalchemy import or_
+
+from .models import ArchivedLicense, Customer, License, Product
+
+EXPIRING_CHOICES = ("30", "60", "90", "expired")
+STATUS_CHOICES = ("active", "expired", "cancelled")
+
+
+def _int_or_none(value):
+    try:
+        return int(value) if value else None
+    except ValueError:
+        return None
+
+
+@dataclass(frozen=True)
+class LicenseFilters:
+    expiring: str | None = None
+    status: str | None = None
+    customer_id: int | None = None
+    product_id: int | None = None
+    q: str | None = None
+    include_archive: bool = False
+
+    @classmethod
+    def from_params(cls, params) -> "LicenseFilters":
+        expiring = params.get("expiring")
+        status = params.get("status")
+        q = (params.get("q") or "").strip()
+        return cls(
+            expiring=expiring if expiring in EXPIRING_CHOICES else None,
+            status=status if status and status != "all" else None,
+            customer_id=_int_or_none(params.get("customer_id")),
+            product_id=_int_or_none(params.get("product_id")),
+            q=q or None,
+            include_archive=params.get("include_archive") == "1",
+        )
+
+    def signature(self) -> tuple:
+        """Normalisierter Schlüssel, gleiche Filter ergeben denselben Wert."""
+        return (
+            self.expiring,
+            self.status,
+            self.customer_id,
+            self.product_id,
+            self.q.lower() if self.q else None,
+            self.include_archive,
+        )
+
+    def license_models(self) -> tuple:
+        """Zu lesende Tiers: standardmäßig nur die heiße Tabelle."""
+        return (License, ArchivedLicense) if self.include_archive else (License,)
+
+
+def apply_license_filters(query, filters: LicenseFilters, today: date, skip: str | None = None, model=License):
+    """Wendet die Filter auf eine Query/Select an, die ``model``, Customer und Product joint.
+
+    ``skip`` lässt eine Dimension aus (expiring, status, customer, product), z.B. für Facetten.
+    ``model`` ist License oder ArchivedLicense.
+    """
+    # Ablauf-Filter
+    if skip != "expiring":
+        if filters.expiring in ("30", "60", "90"):
+            limit_date = today + timedelta(days=int(filters.expiring))
+            query = query.filter(
+                model.end_date != None,
+                model.end_date >= today,
+                model.end_date <= limit_date,
+            )
+        elif filters.expiring == "expired":
+            query = query.filter(
+                model.end_date != None,
+                model.end_date < today,
+            )
+
+    # Status
+    if skip != "status" and filters.status:
+        query = query.filter(model.status == filters.status)
+
+    # Kunde / Produkt
+    if skip != "customer" and filters.customer_id is not None:
+        query = query.filter(model.customer_id == filters.customer_id)
+
+    if skip != "product" and filters.product_id is not None:
+        query = query.filter(model.product_id == filters.product_id)
+
+    # Textsuche
+    if filters.q:
+        pattern = f"%{filters.q}%"
+        query = query.filter(
+            or_(
+                model.license_key.ilike(pattern),
+                Customer.name.ilike(pattern),
+                Product.name.ilike(pattern),
+                model.notes.ilike(pattern),
+            )
+        )
+
+    return query
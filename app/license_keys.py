@@ -0,0 +1,121 @@
+"""Generierung eindeutiger Lizenzschlüssel, auch für viele Lizenzen auf einmal.
+
+Das Format kommt pro Produkt aus ``Product.key_format`` (sonst ``LICENSE_KEY_FORMAT``):
+
+    A  Buchstabe          9  Ziffer          X  Buchstabe oder Ziffer
+    alles andere wird wörtlich übernommen, z.B. "AAA-999-XXX"
+
+Verwechselbare Zeichen (I, O, 0, 1) kommen nicht vor. Kollisionen werden pro Runde mit
+einer einzigen ``IN``-Abfrage gegen den eindeutigen Index auf ``license_key`` geprüft,
+die neuen Lizenzen in einem Batch eingefügt.
+"""
+import logging
+import os
+import secrets
+
+from sqlalchemy import insert, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from . import audit, events, versions
+from .models import ArchivedLicense, License, Product
+
+logger = logging.getLogger(__name__)
+
+LICENSE_KEY_FORMAT = os.getenv("LICENSE_KEY_FORMAT", "XXXXX-XXXXX-XXXXX-XXXXX")
+MAX_BULK_LICENSES = int(os.getenv("MAX_BULK_LICENSES", "10000"))
+
+LETTERS = "ABCDEFGHJKLMNPQRSTUVWXYZ"
+DIGITS = "23456789"
+ALPHABETS = {"A": LETTERS, "9": DIGITS, "X": LETTERS + DIGITS}
+
+# höchstens diesen Anteil des Schlüsselraums vergeben, sonst häufen sich Kollisionen
+MAX_FILL_RATIO = 0.01
+MAX_ROUNDS = 10
+CHECK_CHUNK_SIZE = 500
+
+
+class KeyFormatError(ValueError):
+    pass
+
+
+def key_space(fmt: str) -> int:
+    """Anzahl möglicher Schlüssel für ``fmt``."""
+    size = 1
+    for char in fmt:
+        size *= len(ALPHABETS.get(char, "x"))
+    return size
+
+
+def check_format(fmt: str, count: int = 1):
+    if not any(char in ALPHABETS for char in fmt):
+        raise KeyFormatError(f"Schlüsselformat {fmt!r} enthält keine Platzhalter (A, 9, X)")
+    if len(fmt) > License.license_key.type.length:
+        raise KeyFormatError(f"Schlüsselformat {fmt!r} ist zu lang")
+    if count > key_space(fmt) * MAX_FILL_RATIO:
+        raise KeyFormatError(f"Schlüsselformat {fmt!r} bietet zu wenige Kombinationen für {count} Schlüssel")
+
+
+def generate_key(fmt: str) -> str:
+    return "".join(secrets.choice(ALPHABETS[char]) if char in ALPHABETS else char for char in fmt)
+
+
+def _existing_keys(db: Session, keys: list[str]) -> set[str]:
+    """Welche der ``keys`` schon vergeben sind (aktive Tabelle und Archiv)."""
+    taken = set()
+    for start in range(0, len(keys), CHECK_CHUNK_SIZE):
+        chunk = keys[start:start + CHECK_CHUNK_SIZE]
+        for model in (License, ArchivedLicense):
+            taken.update(db.scalars(select(model.license_key).where(model.license_key.in_(chunk))))
+    return taken
+
+
+def generate_unique_keys(db: Session, fmt: str, count: int) -> list[str]:
+    check_format(fmt, count)
+    keys: set[str] = set()
+    for _ in range(MAX_ROUNDS):
+        missing = count - len(keys)
+        if missing == 0:
+            return list(keys)
+        candidates = {generate_key(fmt) for _ in range(missing)} - keys
+        keys |= candidates - _existing_keys(db, list(candidates))
+    raise KeyFormatError(f"Keine {count} freien Schlüssel im Format {fmt!r} gefunden")
+
+
+def issue_licenses(db: Session, customer_id: int, product_id: int, count: int, **fields) -> list[str]:
+    """Legt ``count`` Lizenzen mit neuen Schlüsseln an und liefert die Schlüssel.
+
+    ``fields`` sind die übrigen Lizenzspalten (seats, start_date, status, ...).
+    """
+    if not 1 <= count <= MAX_BULK_LICENSES:
+        raise ValueError(f"Anzahl muss zwischen 1 und {MAX_BULK_LICENSES} liegen")
+    product = db.get(Product, product_id)
+    if product is None:
+        raise ValueError("Produkt nicht gefunden")
+    fmt = product.key_format or LICENSE_KEY_FORMAT
+
+    # Zwischen Prüfung und Insert kann ein paralleler Request denselben Schlüssel
+    # vergeben, dann greift der Unique-Index und wir versuchen es erneut.
+    for attempt in range(3):
+        keys = generate_unique_keys(db, fmt, count)
+        rows = [
+            {"customer_id": customer_id, "product_id": product_id, "license_key": key, **fields}
+            for key in keys
+        ]
+        try:
+            ids = db.scalars(insert(License).returning(License.id, sort_by_parameter_order=True), rows).all()
+            db.commit()
+            break
+        except IntegrityError:
+            db.rollback()
+            logger.warning("Schlüsselkollision beim Bulk-Insert, neuer Versuch")
+    else:
+        raise KeyFormatError("Schlüssel konnten nicht eindeutig vergeben werden")
+
+    for row, license_id in zip(rows, ids):
+        row["id"] = license_id
+    # Bulk-Insert läuft an den Session-Events vorbei
+    versions.bump("licenses")
+    audit.record_bulk_create(db, "license", rows)
+    events.broker.publish([events.license_change(row, "created") for row in rows])
+    return keys
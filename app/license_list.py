@@ -0,0 +1,85 @@
+"""Datenquelle der Lizenzliste: projizierte Zeilen (``LicenseRow``) statt ORM-Objekte, gecacht pro Filter.
+
+Der Cache hält pro normalisierter Filter-Signatur die geordnete ID-Liste und die
+Zeilendaten. Er wird über die Versionszähler der beteiligten Tabellen invalidiert,
+die bei jedem Commit von Lizenzen, Kunden oder Produkten hochgezählt werden.
+"""
+import os
+from datetime import date
+
+from sqlalchemy.orm import Session
+
+from .filters import LicenseFilters, apply_license_filters
+from .models import Customer, Product
+from .projections import license_list_projection
+from .result_cache import ResultCache, estimate_row_size, estimate_size
+
+LIST_CACHE_MAX_MB = int(os.getenv("LIST_CACHE_MAX_MB", "64"))
+
+cache = ResultCache(
+    "license_list",
+    ("licenses", "licenses_archive", "customers", "products"),
+    max_bytes=LIST_CACHE_MAX_MB * 1024 * 1024,
+)
+
+
+def _select(projection, model, filters: LicenseFilters, today: date):
+    stmt = (
+        projection.select()
+        .select_from(model)
+        .join(Customer, model.customer_id == Customer.id)
+        .join(Product, model.product_id == Product.id)
+        .order_by(model.id)
+    )
+    return apply_license_filters(stmt, filters, today, model=model)
+
+
+def _store(key, version, rows, size: int | None = None):
+    ids = tuple(row.id for row in rows)
+    cache.put(key, version, (ids, rows), size=estimate_size(rows) if size is None else size)
+
+
+def cached_license_rows(filters: LicenseFilters, today: date) -> list | None:
+    cached = cache.get((filters.signature(), today), cache.version())
+    return cached[1] if cached is not None else None
+
+
+def license_rows(db: Session, filters: LicenseFilters, today: date | None = None) -> list:
+    today = today or date.today()
+    key = (filters.signature(), today)
+    # Version vor der Abfrage lesen: ein paralleler Commit macht den Eintrag sofort ungültig
+    version = cache.version()
+
+    cached = cache.get(key, version)
+    if cached is not None:
+        return cached[1]
+
+    rows = []
+    for model in filters.license_models():
+        projection = license_list_projection(model)
+        rows += projection.all(db, _select(projection, model, filters, today))
+    _store(key, version, rows)
+    return rows
+
+
+async def stream_license_rows(filters: LicenseFilters, today: date):
+    """Wie ``license_rows``, aber chunkweise vom Cursor.
+
+    Die Zeilen werden mitgesammelt und landen im Cache, solange sie in dessen
+    ``max_bytes`` passen; erst größere Ergebnisse werden nur gestreamt.
+    """
+    key = (filters.signature(), today)
+    version = cache.version()
+    rows = []
+    size = 0
+    for model in filters.license_models():
+        projection = license_list_projection(model)
+        async for lic in projection.stream(_select(projection, model, filters, today)):
+            if rows is not None:
+                rows.append(lic)
+                size += estimate_row_size(lic)
+                if size > cache.max_bytes:
+                    rows = None
+            yield lic
+    if rows is not None:
+        _store(key, version, rows, size)
@@ -2,23 +2,35 @@ from datetime import date, timedelta
 
 from fastapi import FastAPI
 from fastapi.staticfiles import StaticFiles
-from starlette.middleware.sessions import SessionMiddleware
 
+# versions registriert Session-Events für die Cache-Invalidierung
+from . import archive, audit, events, profiling, ratelimit, schema, search_index, sessions, versions
 from .database import Base, engine, SessionLocal
 from .models import Customer, Product, License, User
-from .security import SECRET_KEY, hash_password
-from .routers import auth, dashboard, customers, products, licenses, admin_users
+from .security import hash_password
+from .routers import (
+    auth, dashboard, customers, products, licenses, admin_users, admin_metrics, audit as audit_router,
+    events as events_router, reconciliation as reconciliation_router, admin_profiles,
+)
 
 
 app = FastAPI()
 
-# Session-Middleware
+# Middlewares: die zuletzt registrierte läuft ganz außen.
+# Profiling und Rate Limiting brauchen die Session, laufen also innerhalb davon.
+app.add_middleware(profiling.ProfilingMiddleware)
+app.add_middleware(ratelimit.RateLimitMiddleware)
+
+# Session-Middleware (serverseitiger Store, Cookie enthält nur die Session-ID)
 app.add_middleware(
-    SessionMiddleware,
-    secret_key=SECRET_KEY,
+    sessions.ServerSessionMiddleware,
+    backend=sessions.backend,
     session_cookie="lm_session",
 )
 
+# Load Shedding vor allem anderen: abgewiesene Requests kosten keinen Session-Lookup
+app.add_middleware(ratelimit.LoadSheddingMiddleware)
+
 # Static Files
 app.mount("/static", StaticFiles(directory="app/static"), name="static")
 
@@ -30,6 +42,11 @@ app.include_router(customers.router)
 app.include_router(products.router)
 app.include_router(licenses.router)
 app.include_router(admin_users.router)
+app.include_router(admin_metrics.router)
+app.include_router(admin_profiles.router)
+app.include_router(events_router.router)
+app.include_router(audit_router.router)
+app.include_router(reconciliation_router.router)
 
 
 
@@ -37,6 +54,13 @@ app.include_router(admin_users.router)
 @app.on_event("startup")
 def on_startup():
     Base.metadata.create_all(bind=engine)
+    schema.upgrade(engine)
+    audit.writer.start()
+    if isinstance(sessions.backend, sessions.DatabaseSessionBackend):
+        # periodisch mit dem Archiv-Lauf, bei ARCHIVE_INTERVAL_HOURS=0 nur beim Start
+        sessions.backend.purge_expired()
+        archive.scheduler.jobs.append(sessions.backend.purge_expired)
+    archive.scheduler.start()
 
     with SessionLocal() as db:
         # Demo-Kunden
@@ -115,3 +139,14 @@ def on_startup():
             )
             db.add(admin)
             db.commit()
+
+    # nach den Demo-Daten, sonst fehlen sie im Index
+    search_index.warm_up()
+
+
+@app.on_event("shutdown")
+def on_shutdown():
+    events.broker.close()
+    archive.scheduler.stop()
+    # ausstehende Audit-Einträge noch schreiben
+    audit.writer.stop()
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, ForeignKey, Date
+from sqlalchemy import Column, Integer, String, Text, ForeignKey, Date, DateTime, Index, UniqueConstraint
 from sqlalchemy.orm import relationship
 from .database import Base
 
@@ -26,6 +26,7 @@ class Product(Base):
     category = Column(String(100), index=True, nullable=True)
     manufacturer = Column(String(255), nullable=True)
     notes = Column(Text, nullable=True)
+    key_format = Column(String(100), nullable=True)  # Format generierter Lizenzschlüssel, z.B. "AAA-999-XXX"
 
     licenses = relationship("License", back_populates="product", cascade="all, delete")
 
@@ -34,14 +35,14 @@ class License(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     
-    customer_id = Column(Integer, ForeignKey("customers.id"), nullable=False)
-    product_id = Column(Integer, ForeignKey("products.id"), nullable=False)
+    customer_id = Column(Integer, ForeignKey("customers.id"), index=True, nullable=False)
+    product_id = Column(Integer, ForeignKey("products.id"), index=True, nullable=False)
 
-    license_key = Column(String(255), nullable=True)
+    license_key = Column(String(255), unique=True, index=True, nullable=True)  # NULL mehrfach erlaubt
     seats = Column(Integer, nullable=True)
 
     start_date = Column(Date, nullable=True)
-    end_date = Column(Date, nullable=True)
+    end_date = Column(Date, index=True, nullable=True)
     interval = Column(String(50), nullable=True)  # monthly, yearly, etc.
     price = Column(String(50), nullable=True)     # string, weil später € oder CHF egal
 
@@ -52,6 +53,36 @@ class License(Base):
     customer = relationship("Customer", back_populates="licenses")
     product = relationship("Product", back_populates="licenses")
 
+    is_archived = False
+
+
+class ArchivedLicense(Base):
+    """Archiv-Tier: lange abgelaufene/gekündigte Lizenzen, gleiche Spalten und IDs wie ``licenses``."""
+    __tablename__ = "licenses_archive"
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+
+    customer_id = Column(Integer, ForeignKey("customers.id", ondelete="CASCADE"), index=True, nullable=False)
+    product_id = Column(Integer, ForeignKey("products.id", ondelete="CASCADE"), index=True, nullable=False)
+
+    license_key = Column(String(255), index=True, nullable=True)
+    seats = Column(Integer, nullable=True)
+
+    start_date = Column(Date, nullable=True)
+    end_date = Column(Date, nullable=True)
+    interval = Column(String(50), nullable=True)
+    price = Column(String(50), nullable=True)
+
+    status = Column(String(50), nullable=True)
+    notes = Column(Text, nullable=True)
+
+    archived_at = Column(DateTime, nullable=False)
+
+    customer = relationship("Customer")
+    product = relationship("Product")
+
+    is_archived = True
+
 class User(Base):
     __tablename__ = "users"
 
@@ -60,3 +91,112 @@ class User(Base):
     password_hash = Column(String(255), nullable=False)
     role = Column(String(50), nullable=False, default="user")  # "admin" / "user"
     is_active = Column(Integer, nullable=False, default=1)     # 1 = aktiv, 0 = gesperrt
+    email = Column(String(255), nullable=True)                 # für Ablauf-Benachrichtigungen
+
+
+class AuditLog(Base):
+    """Append-only Änderungsprotokoll, wird vom Audit-Writer in Batches geschrieben."""
+    __tablename__ = "audit_log"
+
+    id = Column(Integer, primary_key=True)
+    created_at = Column(DateTime, nullable=False, index=True)
+    user_id = Column(Integer, nullable=True)       # kein FK: Einträge überleben gelöschte User
+    username = Column(String(50), nullable=True)
+    entity_type = Column(String(50), nullable=False)  # license, customer, product, user
+    entity_id = Column(Integer, nullable=False)
+    action = Column(String(20), nullable=False)       # create, update, delete
+    changes = Column(Text, nullable=True)             # JSON: {feld: [vorher, nachher]}
+
+    __table_args__ = (
+        # Historie pro Entität, neueste zuerst
+        Index("ix_audit_log_entity", "entity_type", "entity_id", "id"),
+    )
+
+
+class UserSession(Base):
+    """Serverseitige Login-Session (Backend ``db``), der Cookie enthält nur die ID."""
+    __tablename__ = "user_sessions"
+
+    id = Column(String(64), primary_key=True)
+    user_id = Column(Integer, index=True, nullable=True)
+    data = Column(Text, nullable=False)                   # JSON
+    expires_at = Column(DateTime, index=True, nullable=False)
+
+
+class ReconciliationRun(Base):
+    """Ein Abgleich eines Hersteller-Reports gegen unsere Lizenzen, bleibt zum Vergleich erhalten."""
+    __tablename__ = "reconciliation_runs"
+
+    id = Column(Integer, primary_key=True)
+    vendor = Column(String(50), nullable=False, index=True)
+    filename = Column(String(255), nullable=True)
+    started_at = Column(DateTime, nullable=False)
+    finished_at = Column(DateTime, nullable=True)
+    status = Column(String(20), nullable=False)   # running, done, failed
+    error = Column(Text, nullable=True)
+    username = Column(String(50), nullable=True)
+
+    rows_read = Column(Integer, nullable=False, default=0)
+    matched = Column(Integer, nullable=False, default=0)
+    # Anzahl Abweichungen je Art, siehe reconciliation.KINDS
+    over_deployed = Column(Integer, nullable=False, default=0)
+    under_deployed = Column(Integer, nullable=False, default=0)
+    missing_local = Column(Integer, nullable=False, default=0)
+    missing_vendor = Column(Integer, nullable=False, default=0)
+    end_date_mismatch = Column(Integer, nullable=False, default=0)
+    duplicate_local = Column(Integer, nullable=False, default=0, server_default="0")
+
+
+class ReconciliationItem(Base):
+    """Eine Abweichung aus einem Abgleich."""
+    __tablename__ = "reconciliation_items"
+
+    id = Column(Integer, primary_key=True)
+    run_id = Column(Integer, ForeignKey("reconciliation_runs.id", ondelete="CASCADE"), nullable=False)
+    kind = Column(String(30), nullable=False)
+    license_key = Column(String(255), nullable=True)
+    license_id = Column(Integer, nullable=True)   # kein FK: die Lizenz kann später gelöscht werden
+    local_seats = Column(Integer, nullable=True)
+    vendor_seats = Column(Integer, nullable=True)
+    local_end_date = Column(Date, nullable=True)
+    vendor_end_date = Column(Date, nullable=True)
+
+    __table_args__ = (
+        Index("ix_reconciliation_items_run", "run_id", "kind", "id"),
+    )
+
+
+class RequestProfile(Base):
+    """Stichproben-Profil eines einzelnen Requests (siehe profiling.py)."""
+    __tablename__ = "request_profiles"
+
+    id = Column(Integer, primary_key=True)
+    created_at = Column(DateTime, nullable=False, index=True)
+    method = Column(String(10), nullable=False)
+    path = Column(String(500), nullable=False)
+    route = Column(String(255), nullable=True)      # Routen-Template, z.B. /licenses/{license_id}
+    status_code = Column(Integer, nullable=True)
+    username = Column(String(50), nullable=True)
+    trigger = Column(String(20), nullable=False)    # flag oder sample
+    duration_ms = Column(Integer, nullable=False)
+    sample_count = Column(Integer, nullable=False)
+    sql_count = Column(Integer, nullable=False)
+    sql_ms = Column(Integer, nullable=False)
+    stacks = Column(Text, nullable=False)           # JSON: {"a;b;c": Anzahl} (Folded-Format)
+    statements = Column(Text, nullable=False)       # JSON: [[sql, ms], ...]
+
+
+class NotificationLog(Base):
+    """Versandprotokoll der Ablauf-Benachrichtigungen, verhindert Doppelversand bei Wiederholung."""
+    __tablename__ = "notification_log"
+
+    id = Column(Integer, primary_key=True)
+    recipient = Column(String(255), nullable=False)
+    license_id = Column(Integer, nullable=False)
+    window_days = Column(Integer, nullable=False)
+    end_date = Column(Date, nullable=False, index=True)
+    sent_at = Column(DateTime, nullable=False)
+
+    __table_args__ = (
+        UniqueConstraint("recipient", "license_id", "window_days", "end_date", name="uq_notification_log"),
+    )
@@ -0,0 +1,299 @@
+"""Ablauf-Benachrichtigungen: ein Digest pro Kundenkontakt und pro internem Benutzer.
+
+Aufruf z.B. per Cron::
+
+    python -m app.notifications            # versenden
+    python -m app.notifications --dry-run  # nur anzeigen
+
+Für lokale Tests reicht ein SMTP-Stand-in auf localhost:1025 (z.B. der
+``mailpit``-Service aus docker-compose oder ``python -m aiosmtpd -n -l localhost:1025``).
+"""
+import argparse
+import logging
+import os
+import queue
+import smtplib
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+from email.message import EmailMessage
+
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from .database import SessionLocal
+from .models import Customer, License, NotificationLog, Product, User
+
+logger = logging.getLogger(__name__)
+
+# Benachrichtigungsfenster in Tagen, jedes Fenster wird pro Lizenz einmal gemeldet
+NOTIFY_WINDOWS = sorted(int(w) for w in os.getenv("NOTIFY_WINDOWS", "30,60,90").split(",") if w.strip())
+
+SMTP_HOST = os.getenv("SMTP_HOST", "localhost")
+SMTP_PORT = int(os.getenv("SMTP_PORT", "1025"))
+SMTP_USER = os.getenv("SMTP_USER")
+SMTP_PASSWORD = os.getenv("SMTP_PASSWORD")
+SMTP_STARTTLS = os.getenv("SMTP_STARTTLS", "0") == "1"
+SMTP_FROM = os.getenv("SMTP_FROM", "lizenzen@localhost")
+SMTP_POOL_SIZE = int(os.getenv("SMTP_POOL_SIZE", "2"))
+SMTP_RATE_PER_SECOND = float(os.getenv("SMTP_RATE_PER_SECOND", "10"))
+SMTP_MAX_RETRIES = int(os.getenv("SMTP_MAX_RETRIES", "3"))
+
+QUERY_CHUNK_SIZE = 2000
+
+
+class RateLimiter:
+    """Begrenzt die Sendefrequenz über alle Worker-Threads hinweg."""
+
+    def __init__(self, per_second: float):
+        self.interval = 1.0 / per_second if per_second > 0 else 0.0
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            slot = max(self._next, now)
+            self._next = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+class SmtpPool:
+    """Hält bis zu ``size`` offene SMTP-Verbindungen und verwendet sie wieder."""
+
+    def __init__(self, size: int = SMTP_POOL_SIZE):
+        self.size = size
+        self._idle: queue.LifoQueue = queue.LifoQueue()
+
+    def _connect(self) -> smtplib.SMTP:
+        conn = smtplib.SMTP(SMTP_HOST, SMTP_PORT, timeout=30)
+        if SMTP_STARTTLS:
+            conn.starttls()
+        if SMTP_USER:
+            conn.login(SMTP_USER, SMTP_PASSWORD or "")
+        return conn
+
+    @contextmanager
+    def connection(self):
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            conn = self._connect()
+        try:
+            yield conn
+        except Exception:
+            # Verbindung nach Fehlern nicht wiederverwenden
+            _close_quietly(conn)
+            raise
+        self._idle.put(conn)
+
+    def close(self):
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            _close_quietly(conn)
+
+
+def _close_quietly(conn: smtplib.SMTP):
+    try:
+        conn.quit()
+    except Exception:
+        pass
+
+
+def _is_temporary(exc: Exception) -> bool:
+    if isinstance(exc, smtplib.SMTPResponseException):
+        return 400 <= exc.smtp_code < 500
+    if isinstance(exc, smtplib.SMTPRecipientsRefused):
+        return False
+    return isinstance(exc, (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError, OSError))
+
+
+def send_with_retry(pool: SmtpPool, limiter: RateLimiter, msg: EmailMessage) -> bool:
+    for attempt in range(SMTP_MAX_RETRIES + 1):
+        limiter.wait()
+        try:
+            with pool.connection() as conn:
+                conn.send_message(msg)
+            return True
+        except Exception as exc:
+            if not _is_temporary(exc) or attempt == SMTP_MAX_RETRIES:
+                logger.error("Versand an %s fehlgeschlagen: %s", msg["To"], exc)
+                return False
+            time.sleep(2 ** attempt)
+    return False
+
+
+def _window_for(days_left: int, windows: list[int]) -> int | None:
+    for window in windows:
+        if days_left <= window:
+            return window
+    return None
+
+
+def collect_digests(db: Session, today: date, windows: list[int] = NOTIFY_WINDOWS) -> dict:
+    """Sammelt fällige Lizenzen in einer Abfrage und gruppiert sie nach Empfänger.
+
+    Rückgabe: {empfänger: [zeile, ...]}, bereits versendete Einträge sind herausgefiltert.
+    """
+    if not windows:
+        return {}
+    until = today + timedelta(days=max(windows))
+
+    already_sent = {
+        tuple(row)
+        for row in db.query(
+            NotificationLog.recipient,
+            NotificationLog.license_id,
+            NotificationLog.window_days,
+            NotificationLog.end_date,
+        ).filter(NotificationLog.end_date >= today)
+    }
+
+    internal = {
+        email.lower()
+        for (email,) in db.query(User.email).filter(User.is_active == 1, User.email != None)
+    }
+
+    rows = (
+        db.query(
+            License.id.label("license_id"),
+            License.license_key,
+            License.seats,
+            License.end_date,
+            Customer.name.label("customer_name"),
+            Customer.contact_email,
+            Product.name.label("product_name"),
+        )
+        .join(Customer, License.customer_id == Customer.id)
+        .join(Product, License.product_id == Product.id)
+        .filter(
+            License.status == "active",
+            License.end_date != None,
+            License.end_date >= today,
+            License.end_date <= until,
+        )
+        .order_by(License.end_date, Customer.name)
+        .yield_per(QUERY_CHUNK_SIZE)
+    )
+
+    digests = defaultdict(list)
+    for row in rows:
+        window = _window_for((row.end_date - today).days, windows)
+        item = {
+            "license_id": row.license_id,
+            "license_key": row.license_key,
+            "seats": row.seats,
+            "end_date": row.end_date,
+            "customer_name": row.customer_name,
+            "product_name": row.product_name,
+            "window": window,
+        }
+        # Set: Kundenkontakt kann zugleich interner Benutzer sein, sonst doppelte Zeilen im Digest
+        recipients = internal | {row.contact_email.lower()} if row.contact_email else internal
+        for recipient in recipients:
+            if (recipient, row.license_id, window, row.end_date) not in already_sent:
+                digests[recipient].append(item)
+    return digests
+
+
+def _record_sent(db: Session, rows: list[dict]):
+    """Schreibt das Versandprotokoll eines Digests, schon vorhandene Einträge werden übersprungen."""
+    try:
+        db.execute(insert(NotificationLog), rows)
+        db.commit()
+    except IntegrityError:
+        # z.B. paralleler Lauf: einzeln eintragen, damit der Rest protokolliert ist
+        db.rollback()
+        for row in rows:
+            try:
+                db.execute(insert(NotificationLog), [row])
+                db.commit()
+            except IntegrityError:
+                db.rollback()
+
+
+def build_message(recipient: str, items: list[dict], today: date) -> EmailMessage:
+    msg = EmailMessage()
+    msg["From"] = SMTP_FROM
+    msg["To"] = recipient
+    msg["Subject"] = f"Auslaufende Lizenzen ({len(items)})"
+
+    lines = ["Folgende Lizenzen laufen demnächst ab:", ""]
+    for item in items:
+        days_left = (item["end_date"] - today).days
+        lines.append(
+            f"- {item['end_date'].strftime('%d.%m.%Y')} ({days_left} Tage): "
+            f"{item['product_name']} / {item['customer_name']}"
+            f" / Schlüssel {item['license_key'] or '-'} / Sitze {item['seats'] or '-'}"
+        )
+    lines += ["", "Diese Nachricht wurde automatisch von der Lizenzverwaltung erzeugt."]
+    msg.set_content("\n".join(lines))
+    return msg
+
+
+def run(dry_run: bool = False, today: date | None = None) -> dict:
+    """Führt einen Benachrichtigungslauf aus und liefert eine kleine Statistik."""
+    today = today or date.today()
+    stats = {"digests": 0, "sent": 0, "failed": 0, "unrecorded": 0}
+
+    with SessionLocal() as db:
+        digests = collect_digests(db, today)
+        stats["digests"] = len(digests)
+
+        if dry_run:
+            for recipient, items in digests.items():
+                print(build_message(recipient, items, today))
+            return stats
+
+        pool = SmtpPool()
+        limiter = RateLimiter(SMTP_RATE_PER_SECOND)
+        try:
+            with ThreadPoolExecutor(max_workers=pool.size) as executor:
+                futures = {
+                    executor.submit(send_with_retry, pool, limiter, build_message(r, items, today)): r
+                    for r, items in digests.items()
+                }
+                # Protokoll pro Digest sofort schreiben, damit ein Abbruch nichts doppelt verschickt
+                for future in as_completed(futures):
+                    recipient = futures[future]
+                    if not future.result():
+                        stats["failed"] += 1
+                        continue
+                    stats["sent"] += 1
+                    now = datetime.utcnow()
+                    try:
+                        _record_sent(db, [
+                            {
+                                "recipient": recipient,
+                                "license_id": item["license_id"],
+                                "window_days": item["window"],
+                                "end_date": item["end_date"],
+                                "sent_at": now,
+                            }
+                            for item in digests[recipient]
+                        ])
+                    except Exception:
+                        # Lauf nicht abbrechen, die übrigen Digests sind schon unterwegs
+                        db.rollback()
+                        stats["unrecorded"] += 1
+                        logger.exception("Versand an %s konnte nicht protokolliert werden", recipient)
+        finally:
+            pool.close()
+
+    return stats
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Ablauf-Benachrichtigungen versenden")
+    parser.add_argument("--dry-run", action="store_true", help="Digests nur ausgeben")
+    args = parser.parse_args()
+    print(run(dry_run=args.dry_run))
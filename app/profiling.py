@@ -0,0 +1,250 @@
+"""Profiling einzelner Requests auf Abruf, für Admins.
+
+Ausgelöst per ``?_profile=1`` oder Header ``X-Profile: 1`` (nur mit Admin-Session) oder
+zufällig mit ``PROFILE_SAMPLE_RATE`` (0 = aus). Ein Sampler-Thread liest dann alle
+``PROFILE_INTERVAL_MS`` die Stacks der arbeitenden Threads (Event-Loop und Threadpool),
+dazu werden alle SQL-Statements mit Laufzeit mitgeschnitten. Das Ergebnis landet in
+``request_profiles`` und ist unter /admin/profiles als Flamegraph und Aufrufbaum zu sehen.
+
+Ohne Auslöser kostet die Middleware einen Blick in Query-String und Header, die
+SQL-Hooks nur ein ``ContextVar.get``. Die Stichproben sind prozessweit: laufen parallel
+andere Requests, tauchen deren Stacks mit auf.
+"""
+import json
+import logging
+import os
+import random
+import sys
+import threading
+import time
+from contextvars import ContextVar
+from datetime import datetime
+from urllib.parse import parse_qs
+
+from sqlalchemy import delete, event, insert, select
+from starlette.concurrency import run_in_threadpool
+
+from .database import engine, read_engine
+from .models import RequestProfile
+
+logger = logging.getLogger(__name__)
+
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+PROFILE_KEEP = int(os.getenv("PROFILE_KEEP", "200"))
+
+MAX_STACK_DEPTH = 128
+MAX_STATEMENTS = 1000
+# nie profilieren: die Profil-Ansicht selbst, statische Dateien, SSE
+EXEMPT_PREFIXES = ("/admin/profiles", "/static/", "/events")
+
+# Threads, deren innerster Frame hier steht, warten nur und werden nicht gezählt
+IDLE_FRAMES = {
+    ("threading.py", "wait"),
+    ("selectors.py", "select"),
+    ("queue.py", "get"),
+    ("runners.py", "run"),  # uvloop: Event-Loop wartet in C
+}
+
+_current: ContextVar["Profile | None"] = ContextVar("profile", default=None)
+
+
+def _frame_label(code) -> str:
+    filename = code.co_filename.replace("\\", "/")
+    for marker in ("/site-packages/", "/app/"):
+        if marker in filename:
+            filename = ("app/" if marker == "/app/" else "") + filename.split(marker, 1)[1]
+            break
+    else:
+        filename = filename.rsplit("/", 1)[-1]
+    return f"{code.co_name} ({filename}:{code.co_firstlineno})"
+
+
+def _is_idle(frame) -> bool:
+    code = frame.f_code
+    return (code.co_filename.replace("\\", "/").rsplit("/", 1)[-1], code.co_name) in IDLE_FRAMES
+
+
+class Profile:
+    """Sammelt Stichproben und SQL-Statements eines Requests."""
+
+    def __init__(self, interval: float = PROFILE_INTERVAL_MS / 1000):
+        self.interval = interval
+        self.stacks: dict[str, int] = {}
+        self.sample_count = 0
+        self.statements: list = []
+        self.sql_count = 0
+        self.sql_seconds = 0.0
+        self.started = 0.0
+        self.duration = 0.0
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self):
+        self.started = time.perf_counter()
+        self._thread = threading.Thread(target=self._sample, name="profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self.duration = time.perf_counter() - self.started
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _sample(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own or _is_idle(frame):
+                    continue
+                labels = []
+                while frame is not None and len(labels) < MAX_STACK_DEPTH:
+                    labels.append(_frame_label(frame.f_code))
+                    frame = frame.f_back
+                key = ";".join(reversed(labels))
+                self.stacks[key] = self.stacks.get(key, 0) + 1
+                self.sample_count += 1
+
+    def add_statement(self, statement: str, seconds: float):
+        self.sql_count += 1
+        self.sql_seconds += seconds
+        if len(self.statements) < MAX_STATEMENTS:
+            self.statements.append((statement, round(seconds * 1000, 2)))
+
+
+def _before_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current.get() is not None:
+        conn.info.setdefault("profile_started", []).append(time.perf_counter())
+
+
+def _after_execute(conn, cursor, statement, parameters, context, executemany):
+    profile = _current.get()
+    if profile is None:
+        return
+    started = conn.info.get("profile_started")
+    if started:
+        profile.add_statement(statement, time.perf_counter() - started.pop())
+
+
+for _engine in {engine, read_engine}:
+    event.listen(_engine, "before_cursor_execute", _before_execute)
+    event.listen(_engine, "after_cursor_execute", _after_execute)
+
+
+def _route_template(scope) -> str | None:
+    endpoint = scope.get("endpoint")
+    if endpoint is None:
+        return None
+    for route in getattr(scope.get("app"), "routes", ()):
+        if getattr(route, "endpoint", None) is endpoint:
+            return route.path
+    return endpoint.__name__
+
+
+def _store(profile: Profile, scope, status_code: int | None, username: str | None, trigger: str):
+    row = {
+        "created_at": datetime.utcnow(),
+        "method": scope["method"],
+        "path": (scope["path"] + ("?" + scope["query_string"].decode("latin-1") if scope.get("query_string") else ""))[:500],
+        "route": _route_template(scope),
+        "status_code": status_code,
+        "username": username,
+        "trigger": trigger,
+        "duration_ms": round(profile.duration * 1000),
+        "sample_count": profile.sample_count,
+        "sql_count": profile.sql_count,
+        "sql_ms": round(profile.sql_seconds * 1000),
+        "stacks": json.dumps(profile.stacks),
+        "statements": json.dumps(profile.statements),
+    }
+    table = RequestProfile.__table__
+    with engine.begin() as conn:
+        conn.execute(insert(table), row)
+        # nur die neuesten PROFILE_KEEP behalten
+        cutoff = conn.execute(
+            select(table.c.id).order_by(table.c.id.desc()).offset(PROFILE_KEEP).limit(1)
+        ).scalar()
+        if cutoff is not None:
+            conn.execute(delete(table).where(table.c.id <= cutoff))
+
+
+def _flagged(scope) -> bool:
+    query_string = scope.get("query_string", b"")
+    # Teilstring nur als Vorfilter, sonst zählten auch x_profile=1 oder _profile=10
+    if b"_profile" in query_string and parse_qs(query_string.decode("latin-1")).get("_profile") == ["1"]:
+        return True
+    for name, value in scope["headers"]:
+        if name == b"x-profile":
+            return value == b"1"
+    return False
+
+
+class ProfilingMiddleware:
+    """Muss innerhalb der Session-Middleware laufen (Admin-Prüfung für den Flag)."""
+
+    def __init__(self, app, sample_rate: float = PROFILE_SAMPLE_RATE):
+        self.app = app
+        self.sample_rate = sample_rate
+
+    def _trigger(self, scope) -> str | None:
+        if scope["path"].startswith(EXEMPT_PREFIXES):
+            return None
+        if _flagged(scope) and scope.get("session", {}).get("role") == "admin":
+            return "flag"
+        if self.sample_rate and random.random() < self.sample_rate:
+            return "sample"
+        return None
+
+    async def __call__(self, scope, receive, send):
+        trigger = self._trigger(scope) if scope["type"] == "http" else None
+        if trigger is None:
+            await self.app(scope, receive, send)
+            return
+
+        status_code = None
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        profile = Profile()
+        token = _current.set(profile)
+        profile.start()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            profile.stop()
+            _current.reset(token)
+            username = scope.get("session", {}).get("username")
+            try:
+                await run_in_threadpool(_store, profile, scope, status_code, username, trigger)
+            except Exception:
+                logger.exception("Profil konnte nicht gespeichert werden")
+
+
+def call_tree(stacks: dict[str, int], min_fraction: float = 0.005) -> dict:
+    """Folded Stacks -> Baum {"name", "value", "children": [...]}, Kinder nach Anteil sortiert.
+
+    Äste unter ``min_fraction`` aller Stichproben werden weggelassen.
+    """
+    root = {"name": "alle", "value": 0, "children": {}}
+    for stack, count in stacks.items():
+        root["value"] += count
+        node = root
+        for label in stack.split(";"):
+            child = node["children"].get(label)
+            if child is None:
+                child = node["children"][label] = {"name": label, "value": 0, "children": {}}
+            child["value"] += count
+            node = child
+
+    threshold = root["value"] * min_fraction
+
+    def finish(node):
+        children = (finish(c) for c in node["children"].values() if c["value"] >= threshold)
+        node["children"] = sorted(children, key=lambda c: -c["value"])
+        return node
+
+    return finish(root)
@@ -0,0 +1,98 @@
+"""Spalten-Projektionen für Listenansichten.
+
+Eine Projektion ist eine feste Spaltenauswahl mit einem schlanken Zeilentyp
+(namedtuple). Gelesen wird per Core-Select: keine ORM-Objekte, keine Identity Map,
+keine nicht angezeigten Spalten wie ``notes``. Templates greifen wie gewohnt über
+Attribute zu (``row.name``).
+"""
+from collections import namedtuple
+from functools import lru_cache
+
+from sqlalchemy import func, literal, select
+from sqlalchemy.orm import Session
+
+from .models import Customer, License, Product
+from .streaming import iter_rows
+
+_row_types: dict = {}
+
+
+def _row_type(name: str, fields: tuple):
+    key = (name, fields)
+    if key not in _row_types:
+        _row_types[key] = namedtuple(name, fields)
+    return _row_types[key]
+
+
+class Projection:
+    def __init__(self, row_name: str, **columns):
+        self.columns = columns
+        self.row_type = _row_type(row_name, tuple(columns))
+
+    def select(self):
+        return select(*(column.label(key) for key, column in self.columns.items()))
+
+    def make(self, row):
+        return self.row_type._make(row)
+
+    def all(self, db: Session, stmt) -> list:
+        make = self.row_type._make
+        return [make(row) for row in db.execute(stmt)]
+
+    async def stream(self, stmt):
+        """Wie ``all``, aber chunkweise vom serverseitigen Cursor (siehe streaming.iter_rows)."""
+        make = self.row_type._make
+        async for row in iter_rows(stmt):
+            yield make(row)
+
+
+CUSTOMER_LIST = Projection(
+    "CustomerRow",
+    id=Customer.id,
+    customer_number=Customer.customer_number,
+    name=Customer.name,
+    contact_name=Customer.contact_name,
+    contact_email=Customer.contact_email,
+    contact_phone=Customer.contact_phone,
+)
+
+PRODUCT_LIST = Projection(
+    "ProductRow",
+    id=Product.id,
+    name=Product.name,
+    category=Product.category,
+    manufacturer=Product.manufacturer,
+    license_count=func.count(License.id),
+)
+
+
+@lru_cache(maxsize=None)
+def license_list_projection(model) -> Projection:
+    """Zeilen der Lizenzliste, ``model`` ist License oder ArchivedLicense."""
+    return Projection(
+        "LicenseRow",
+        id=model.id,
+        customer_name=Customer.name,
+        product_name=Product.name,
+        license_key=model.license_key,
+        seats=model.seats,
+        start_date=model.start_date,
+        end_date=model.end_date,
+        status=model.status,
+        is_archived=literal(model.is_archived),
+    )
+
+
+RELATED_LICENSE = Projection(
+    "RelatedLicenseRow",
+    id=License.id,
+    license_key=License.license_key,
+    seats=License.seats,
+    start_date=License.start_date,
+    end_date=License.end_date,
+    status=License.status,
+    customer_id=Customer.id,
+    customer_name=Customer.name,
+    product_id=Product.id,
+    product_name=Product.name,
+)
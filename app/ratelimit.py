@@ -0,0 +1,275 @@
+"""Rate Limiting und Load Shedding.
+
+``RateLimitMiddleware`` vergibt Token-Buckets pro eingeloggtem Benutzer und pro IP, mit
+eigenen Budgets für teure Routen (Suche, Export, Login). Wer sein Budget aufgebraucht
+hat, bekommt 429 mit ``Retry-After``.
+
+``LoadSheddingMiddleware`` sitzt ganz außen und lehnt neue Requests mit 503 ab, sobald
+zu viele gleichzeitig laufen oder der DB-Pool länger als ``SHED_POOL_WAIT_MS`` komplett
+belegt ist. Lieber ein paar Requests sofort abweisen als alle in den Timeout laufen lassen.
+
+Alles liegt im Speicher des Prozesses, die Grenzen gelten also pro Worker.
+"""
+import math
+import os
+import threading
+import time
+from urllib.parse import parse_qs
+
+from sqlalchemy import event
+from sqlalchemy.pool import QueuePool
+from starlette.responses import PlainTextResponse
+
+from .database import read_engine
+
+RATE_LIMITS_ENABLED = os.getenv("RATE_LIMITS_ENABLED", "1") == "1"
+# X-Forwarded-For nur hinter einem eigenen Reverse Proxy auswerten
+RATE_LIMIT_TRUST_PROXY = os.getenv("RATE_LIMIT_TRUST_PROXY", "0") == "1"
+
+SHED_MAX_IN_FLIGHT = int(os.getenv("SHED_MAX_IN_FLIGHT", "64"))
+SHED_POOL_WAIT_MS = int(os.getenv("SHED_POOL_WAIT_MS", "2000"))
+SHED_RETRY_AFTER = 5
+
+# Pfade ohne Limits: statische Dateien und der langlebige SSE-Stream
+EXEMPT_PREFIXES = ("/static/", "/events")
+
+MAX_TRACKED_KEYS = 10000
+
+
+class TokenBucket:
+    __slots__ = ("tokens", "updated")
+
+    def __init__(self, capacity: float, now: float):
+        self.tokens = capacity
+        self.updated = now
+
+
+class RateLimiter:
+    """Ein Budget: ``per_minute`` Requests im Mittel, Spitzen bis ``burst``."""
+
+    def __init__(self, name: str, per_minute: int, burst: int):
+        self.name = name
+        self.per_minute = per_minute
+        self.rate = per_minute / 60.0
+        self.burst = burst
+        self._buckets: dict[str, TokenBucket] = {}
+        self.allowed = 0
+        self.limited = 0
+
+    def _refill(self, bucket: TokenBucket, now: float):
+        bucket.tokens = min(self.burst, bucket.tokens + (now - bucket.updated) * self.rate)
+        bucket.updated = now
+
+    def wait_time(self, key: str, now: float) -> float:
+        """0, wenn ein Token frei ist, sonst die Sekunden bis zum nächsten (ohne zu verbrauchen)."""
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            return 0.0
+        self._refill(bucket, now)
+        if bucket.tokens >= 1:
+            return 0.0
+        return (1 - bucket.tokens) / self.rate
+
+    def take(self, key: str, now: float):
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            if len(self._buckets) >= MAX_TRACKED_KEYS:
+                self._prune(now)
+            bucket = self._buckets[key] = TokenBucket(self.burst, now)
+        else:
+            self._refill(bucket, now)
+        bucket.tokens -= 1
+
+    def _prune(self, now: float):
+        """Wirft volle (also lange ungenutzte) Buckets weg, sie entsprechen einem neuen."""
+        for key, bucket in list(self._buckets.items()):
+            self._refill(bucket, now)
+            if bucket.tokens >= self.burst:
+                del self._buckets[key]
+
+    def stats(self) -> dict:
+        return {
+            "per_minute": self.per_minute,
+            "burst": self.burst,
+            "keys": len(self._buckets),
+            "allowed": self.allowed,
+            "limited": self.limited,
+        }
+
+
+def _budget(name: str, per_minute: int, burst: int) -> RateLimiter:
+    env = f"RATE_LIMIT_{name.upper()}"
+    return RateLimiter(
+        name,
+        int(os.getenv(f"{env}_PER_MINUTE", str(per_minute))),
+        int(os.getenv(f"{env}_BURST", str(burst))),
+    )
+
+
+LIMITERS = {
+    "default": _budget("default", 300, 60),
+    "search": _budget("search", 30, 10),
+    "export": _budget("export", 5, 2),
+    "login": _budget("login", 10, 5),
+}
+
+
+def classify(scope) -> str | None:
+    """Welches Budget für den Request gilt, ``None`` = keins."""
+    path = scope["path"]
+    if path.startswith(EXEMPT_PREFIXES):
+        return None
+    if path == "/login" and scope["method"] == "POST":
+        return "login"
+    if path == "/licenses/export":
+        return "export"
+    if path in ("/licenses", "/customers"):
+        # Textsuche ohne Index: jeder Aufruf ist ein Full Scan
+        if parse_qs(scope.get("query_string", b"").decode("latin-1")).get("q"):
+            return "search"
+    return "default"
+
+
+def client_ip(scope) -> str:
+    if RATE_LIMIT_TRUST_PROXY:
+        for name, value in scope["headers"]:
+            if name == b"x-forwarded-for":
+                return value.decode("latin-1").split(",")[0].strip()
+    client = scope.get("client")
+    return client[0] if client else "unknown"
+
+
+def _retry_response(status_code: int, message: str, retry_after: float):
+    return PlainTextResponse(
+        message,
+        status_code=status_code,
+        headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+    )
+
+
+class RateLimitMiddleware:
+    """Muss innerhalb der Session-Middleware laufen (braucht ``scope["session"]``)."""
+
+    def __init__(self, app, limiters: dict = LIMITERS, enabled: bool = RATE_LIMITS_ENABLED):
+        self.app = app
+        self.limiters = limiters
+        self.enabled = enabled
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        name = classify(scope)
+        if name is None:
+            await self.app(scope, receive, send)
+            return
+
+        limiter = self.limiters[name]
+        keys = [f"ip:{client_ip(scope)}"]
+        user_id = scope.get("session", {}).get("user_id")
+        if user_id and name != "login":
+            keys.append(f"user:{user_id}")
+
+        now = time.monotonic()
+        # erst alle Buckets prüfen, dann verbrauchen: ein abgelehnter Request kostet nichts
+        wait = max(limiter.wait_time(key, now) for key in keys)
+        if wait > 0:
+            limiter.limited += 1
+            response = _retry_response(429, "Zu viele Anfragen, bitte kurz warten.", wait)
+            await response(scope, receive, send)
+            return
+
+        for key in keys:
+            limiter.take(key, now)
+        limiter.allowed += 1
+        await self.app(scope, receive, send)
+
+
+class PoolMonitor:
+    """Merkt sich, seit wann alle Verbindungen des DB-Pools ausgeliehen sind."""
+
+    def __init__(self, engine):
+        pool = engine.pool
+        self.capacity = None
+        if isinstance(pool, QueuePool) and pool._max_overflow >= 0:
+            self.capacity = pool.size() + pool._max_overflow
+        self.checked_out = 0
+        self.saturated_since: float | None = None
+        self._lock = threading.Lock()
+        event.listen(engine, "checkout", self._checkout)
+        event.listen(engine, "checkin", self._checkin)
+
+    def _checkout(self, dbapi_connection, connection_record, connection_proxy):
+        with self._lock:
+            self.checked_out += 1
+            if self.capacity and self.checked_out >= self.capacity and self.saturated_since is None:
+                self.saturated_since = time.monotonic()
+
+    def _checkin(self, dbapi_connection, connection_record):
+        with self._lock:
+            self.checked_out = max(0, self.checked_out - 1)
+            if self.capacity is None or self.checked_out < self.capacity:
+                self.saturated_since = None
+
+    def saturated_for(self, now: float) -> float:
+        since = self.saturated_since
+        return now - since if since is not None else 0.0
+
+
+class LoadShedder:
+    """Zählt laufende Requests und entscheidet, ob neue abgewiesen werden."""
+
+    def __init__(self, monitor: PoolMonitor, max_in_flight: int = SHED_MAX_IN_FLIGHT, pool_wait_ms: int = SHED_POOL_WAIT_MS):
+        self.monitor = monitor
+        self.max_in_flight = max_in_flight
+        self.pool_wait = pool_wait_ms / 1000
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.shed = 0
+
+    def overloaded(self) -> bool:
+        if self.max_in_flight and self.in_flight >= self.max_in_flight:
+            return True
+        return bool(self.pool_wait) and self.monitor.saturated_for(time.monotonic()) > self.pool_wait
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": self.in_flight,
+            "peak_in_flight": self.peak_in_flight,
+            "max_in_flight": self.max_in_flight,
+            "shed": self.shed,
+            "pool_checked_out": self.monitor.checked_out,
+            "pool_capacity": self.monitor.capacity,
+        }
+
+
+# Requests warten auf Leseverbindungen, der eine SQLite-Writer ist bewusst oft belegt
+shedder = LoadShedder(PoolMonitor(read_engine))
+
+
+class LoadSheddingMiddleware:
+    """Gehört ganz nach außen, damit abgewiesene Requests nicht einmal die Session laden."""
+
+    def __init__(self, app, shedder: LoadShedder = shedder):
+        self.app = app
+        self.shedder = shedder
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"].startswith(EXEMPT_PREFIXES):
+            await self.app(scope, receive, send)
+            return
+
+        shedder = self.shedder
+        if shedder.overloaded():
+            shedder.shed += 1
+            response = _retry_response(503, "Server ausgelastet, bitte gleich erneut versuchen.", SHED_RETRY_AFTER)
+            await response(scope, receive, send)
+            return
+
+        shedder.in_flight += 1
+        shedder.peak_in_flight = max(shedder.peak_in_flight, shedder.in_flight)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            shedder.in_flight -= 1
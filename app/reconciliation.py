@@ -0,0 +1,342 @@
+"""Abgleich der Hersteller-Nutzungsreports (ESET, Securepoint, ...) mit unseren Lizenzen.
+
+Hash-Join über ``license_key``: die Lizenzen der Herstellerprodukte werden einmal als
+kompaktes Dict geladen (Build-Seite), die CSV wird zeilenweise gestreamt (Probe-Seite).
+Der Speicherbedarf hängt damit von der Zahl unserer Lizenzen ab, nicht von der Größe des
+Reports. Abweichungen gehen in Batches nach ``reconciliation_items``, jeder Lauf bleibt
+mit seinen Kennzahlen in ``reconciliation_runs`` erhalten.
+
+    python -m app.reconciliation eset report.csv
+    python -m app.reconciliation generic report.csv --product 3
+"""
+import argparse
+import csv
+import io
+import logging
+from dataclasses import dataclass
+from datetime import date, datetime
+from functools import lru_cache, partial
+
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.orm import Session
+
+from .database import SessionLocal, engine, read_engine
+from .models import License, Product, ReconciliationItem, ReconciliationRun
+
+logger = logging.getLogger(__name__)
+
+ITEM_BATCH_SIZE = 1000
+QUERY_CHUNK_SIZE = 5000
+
+# Art der Abweichung -> Zählerspalte in reconciliation_runs
+KINDS = {
+    "over_deployed": "mehr Seats genutzt als lizenziert",
+    "under_deployed": "weniger Seats genutzt als lizenziert",
+    "missing_local": "Schlüssel nur beim Hersteller",
+    "missing_vendor": "aktive Lizenz fehlt im Report",
+    "end_date_mismatch": "Enddatum weicht ab",
+    "duplicate_local": "Schlüssel bei uns mehrfach (Schreibweise)",
+}
+
+
+class ReconciliationError(ValueError):
+    pass
+
+
+@dataclass(frozen=True)
+class VendorFormat:
+    """Spaltennamen im Export des Herstellers (Groß-/Kleinschreibung egal)."""
+    label: str
+    key: str
+    seats: str
+    end_date: str | None = None
+    delimiter: str = ","
+    date_formats: tuple = ("%Y-%m-%d",)
+    # Produkte mit diesem Hersteller werden abgeglichen (None = alle bzw. per --product)
+    manufacturer: str | None = None
+
+
+VENDOR_FORMATS = {
+    "eset": VendorFormat(
+        label="ESET",
+        key="License Key",
+        seats="Used Units",
+        end_date="Expiration Date",
+        date_formats=("%Y-%m-%d", "%d.%m.%Y", "%m/%d/%Y"),
+        manufacturer="ESET",
+    ),
+    "securepoint": VendorFormat(
+        label="Securepoint",
+        key="Lizenz",
+        seats="Benutzer",
+        end_date="Ablaufdatum",
+        delimiter=";",
+        date_formats=("%d.%m.%Y", "%Y-%m-%d"),
+        manufacturer="Securepoint",
+    ),
+    "generic": VendorFormat(
+        label="Allgemein (license_key, seats, end_date)",
+        key="license_key",
+        seats="seats",
+        end_date="end_date",
+    ),
+}
+
+
+def normalize_key(value: str | None) -> str:
+    return (value or "").strip().upper()
+
+
+def _parse_int(value: str) -> int | None:
+    value = value.strip()
+    if not value:
+        return None
+    try:
+        return int(float(value.replace(",", ".")))
+    except ValueError:
+        return None
+
+
+def _parse_date(value: str, formats: tuple) -> date | None:
+    value = value.strip()
+    if not value:
+        return None
+    for fmt in formats:
+        try:
+            return datetime.strptime(value, fmt).date()
+        except ValueError:
+            continue
+    return None
+
+
+def _column_index(header: list[str], name: str | None, required: bool = True) -> int | None:
+    if name is None:
+        return None
+    lookup = {column.strip().lower(): i for i, column in enumerate(header)}
+    index = lookup.get(name.lower())
+    if index is None and required:
+        raise ReconciliationError(f"Spalte {name!r} fehlt im Report")
+    return index
+
+
+def scope_product_ids(db: Session, fmt: VendorFormat, product_ids: list[int] | None = None) -> list[int] | None:
+    """Produkte im Abgleich, ``None`` = alle."""
+    if product_ids:
+        return product_ids
+    if fmt.manufacturer is None:
+        return None
+    ids = db.scalars(
+        select(Product.id).where(func.lower(Product.manufacturer) == fmt.manufacturer.lower())
+    ).all()
+    if not ids:
+        raise ReconciliationError(f"Keine Produkte des Herstellers {fmt.manufacturer} vorhanden")
+    return ids
+
+
+def _load_local(conn, product_ids: list[int] | None) -> tuple[dict, dict]:
+    """Build-Seite: normalisierter Schlüssel -> [id, seats, end_date, status, gefunden, vendor_seats, vendor_end, key].
+
+    Schlüssel, die sich nur in Groß-/Kleinschreibung oder Leerzeichen unterscheiden,
+    werden mit der ältesten Lizenz abgeglichen; alle beteiligten Lizenzen kommen
+    zusätzlich als ``(id, license_key, seats, end_date)`` in das zweite Dict.
+    """
+    stmt = select(License.id, License.license_key, License.seats, License.end_date, License.status).where(
+        License.license_key != None
+    ).order_by(License.id)
+    if product_ids is not None:
+        stmt = stmt.where(License.product_id.in_(product_ids))
+    local = {}
+    duplicates = {}
+    # Core statt ORM-Session: spart den ORM-Overhead pro Zeile
+    for license_id, key, seats, end_date, status in conn.execute(stmt.execution_options(yield_per=QUERY_CHUNK_SIZE)):
+        normalized = normalize_key(key)
+        entry = local.get(normalized)
+        if entry is None:
+            local[normalized] = [license_id, seats, end_date, status, False, None, None, key]
+            continue
+        if normalized not in duplicates:
+            duplicates[normalized] = [(entry[0], entry[7], entry[1], entry[2])]
+        duplicates[normalized].append((license_id, key, seats, end_date))
+    return local, duplicates
+
+
+class _ItemWriter:
+    """Sammelt Abweichungen und schreibt sie in Batches, zählt je Art mit.
+
+    Jeder Batch ist eine eigene kurze Transaktion: im Single-Node-Modus gibt es nur eine
+    Schreibverbindung, die sonst für den ganzen Abgleich belegt wäre.
+    """
+
+    def __init__(self, run_id: int):
+        self.run_id = run_id
+        self.counts = dict.fromkeys(KINDS, 0)
+        self._batch: list[dict] = []
+
+    def add(self, kind: str, key: str, license_id=None, local_seats=None, vendor_seats=None,
+            local_end_date=None, vendor_end_date=None):
+        self.counts[kind] += 1
+        self._batch.append({
+            "run_id": self.run_id,
+            "kind": kind,
+            "license_key": key,
+            "license_id": license_id,
+            "local_seats": local_seats,
+            "vendor_seats": vendor_seats,
+            "local_end_date": local_end_date,
+            "vendor_end_date": vendor_end_date,
+        })
+        if len(self._batch) >= ITEM_BATCH_SIZE:
+            self.flush()
+
+    def flush(self):
+        if self._batch:
+            with engine.begin() as conn:
+                conn.execute(ReconciliationItem.__table__.insert(), self._batch)
+            self._batch = []
+
+
+def reconcile(text_stream, vendor: str, filename: str | None = None,
+              product_ids: list[int] | None = None, username: str | None = None) -> int:
+    """Gleicht den CSV-Report aus ``text_stream`` ab und liefert die ID des Laufs."""
+    fmt = VENDOR_FORMATS.get(vendor)
+    if fmt is None:
+        raise ReconciliationError(f"Unbekannter Hersteller {vendor!r}")
+
+    with engine.begin() as conn:
+        run_id = conn.execute(
+            insert(ReconciliationRun).returning(ReconciliationRun.id),
+            {
+                "vendor": vendor,
+                "filename": filename,
+                "started_at": datetime.utcnow(),
+                "status": "running",
+                "username": username,
+            },
+        ).scalar_one()
+
+    try:
+        result = _reconcile(run_id, text_stream, fmt, product_ids)
+    except Exception as exc:
+        with engine.begin() as conn:
+            # bereits geschriebene Batches gehören zu keinem gültigen Ergebnis
+            conn.execute(delete(ReconciliationItem).where(ReconciliationItem.run_id == run_id))
+            conn.execute(
+                update(ReconciliationRun)
+                .where(ReconciliationRun.id == run_id)
+                .values(status="failed", error=str(exc), finished_at=datetime.utcnow())
+            )
+        raise
+
+    with engine.begin() as conn:
+        conn.execute(
+            update(ReconciliationRun)
+            .where(ReconciliationRun.id == run_id)
+            .values(status="done", finished_at=datetime.utcnow(), **result)
+        )
+    return run_id
+
+
+def _reconcile(run_id: int, text_stream, fmt: VendorFormat, product_ids: list[int] | None) -> dict:
+    with SessionLocal() as db:
+        product_ids = scope_product_ids(db, fmt, product_ids)
+    with read_engine.connect() as conn:
+        local, duplicates = _load_local(conn, product_ids)
+
+    reader = csv.reader(text_stream, delimiter=fmt.delimiter)
+    header = next(reader, None)
+    if header is None:
+        raise ReconciliationError("Report ist leer")
+    key_col = _column_index(header, fmt.key)
+    seats_col = _column_index(header, fmt.seats)
+    end_col = _column_index(header, fmt.end_date, required=False)
+    width = max(i for i in (key_col, seats_col, end_col) if i is not None) + 1
+
+    return _join(run_id, reader, local, duplicates, fmt, key_col, seats_col, end_col, width)
+
+
+def _join(run_id, reader, local, duplicates, fmt, key_col, seats_col, end_col, width) -> dict:
+    items = _ItemWriter(run_id)
+    for entries in duplicates.values():
+        for license_id, key, seats, end_date in entries:
+            items.add("duplicate_local", key, license_id, local_seats=seats, local_end_date=end_date)
+    rows_read = 0
+    # Reports enthalten nur wenige verschiedene Datumswerte, strptime ist teuer
+    parse_date = lru_cache(maxsize=4096)(partial(_parse_date, formats=fmt.date_formats))
+
+    # Probe-Seite: Report zeilenweise, gleiche Schlüssel werden aufsummiert
+    for row in reader:
+        if len(row) < width:
+            continue
+        key = normalize_key(row[key_col])
+        if not key:
+            continue
+        rows_read += 1
+        seats = _parse_int(row[seats_col])
+        end_date = parse_date(row[end_col]) if end_col is not None else None
+
+        entry = local.get(key)
+        if entry is None:
+            items.add("missing_local", key, vendor_seats=seats, vendor_end_date=end_date)
+            continue
+        entry[4] = True
+        if seats is not None:
+            entry[5] = (entry[5] or 0) + seats
+        if end_date is not None and (entry[6] is None or end_date > entry[6]):
+            entry[6] = end_date
+
+    matched = 0
+    for key, (license_id, seats, end_date, status, found, vendor_seats, vendor_end, _) in local.items():
+        if not found:
+            if status == "active":
+                items.add("missing_vendor", key, license_id, local_seats=seats, local_end_date=end_date)
+            continue
+        matched += 1
+        if seats is not None and vendor_seats is not None and vendor_seats != seats:
+            kind = "over_deployed" if vendor_seats > seats else "under_deployed"
+            items.add(kind, key, license_id, local_seats=seats, vendor_seats=vendor_seats)
+        if end_date is not None and vendor_end is not None and vendor_end != end_date:
+            items.add("end_date_mismatch", key, license_id, local_end_date=end_date, vendor_end_date=vendor_end)
+    items.flush()
+
+    return {"rows_read": rows_read, "matched": matched, **items.counts}
+
+
+def reconcile_file(binary_file, vendor: str, **kwargs) -> int:
+    """Wie ``reconcile``, für Binärdateien (Upload, ``open(..., "rb")``); BOM wird ignoriert."""
+    text = io.TextIOWrapper(binary_file, encoding="utf-8-sig", errors="replace", newline="")
+    try:
+        return reconcile(text, vendor, **kwargs)
+    finally:
+        # nicht die zugrunde liegende Datei schließen, das macht der Aufrufer
+        text.detach()
+
+
+def previous_run(db: Session, run: ReconciliationRun) -> ReconciliationRun | None:
+    """Letzter erfolgreicher Lauf desselben Herstellers vor ``run``."""
+    return (
+        db.query(ReconciliationRun)
+        .filter(
+            ReconciliationRun.vendor == run.vendor,
+            ReconciliationRun.status == "done",
+            ReconciliationRun.id < run.id,
+        )
+        .order_by(ReconciliationRun.id.desc())
+        .first()
+    )
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Hersteller-Report mit den Lizenzen abgleichen")
+    parser.add_argument("vendor", choices=sorted(VENDOR_FORMATS))
+    parser.add_argument("file", help="CSV-Export des Herstellers")
+    parser.add_argument("--product", type=int, action="append", help="nur diese Produkt-ID(s)")
+    args = parser.parse_args()
+
+    with open(args.file, "rb") as f:
+        run_id = reconcile_file(f, args.vendor, filename=args.file, product_ids=args.product)
+    with SessionLocal() as db:
+        run = db.get(ReconciliationRun, run_id)
+        print(f"Lauf {run.id}: {run.rows_read} Zeilen, {run.matched} zugeordnet")
+        for kind, label in KINDS.items():
+            print(f"  {label}: {getattr(run, kind)}")
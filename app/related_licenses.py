@@ -0,0 +1,80 @@
+"""Lizenz-Untertabellen auf den Kunden- und Produktdetailseiten.
+
+Eine Seite kommt aus einer einzigen Abfrage, die nur die angezeigten Spalten lädt
+(kein Lazy Load pro Zeile). Die Kennzahlen liefert eine Aggregat-Abfrage.
+"""
+from datetime import date, timedelta
+
+from sqlalchemy import case, func
+from sqlalchemy.orm import Session
+
+from .models import Customer, License, Product
+from .projections import RELATED_LICENSE
+
+PAGE_SIZE = 50
+EXPIRING_DAYS = 30
+
+
+def _owner_filter(customer_id: int | None, product_id: int | None):
+    if customer_id is not None:
+        return License.customer_id == customer_id
+    return License.product_id == product_id
+
+
+def license_page(
+    db: Session,
+    page: int,
+    customer_id: int | None = None,
+    product_id: int | None = None,
+    page_size: int = PAGE_SIZE,
+):
+    """Liefert (zeilen, has_next) für eine Seite der Lizenzen eines Kunden oder Produkts."""
+    stmt = (
+        RELATED_LICENSE.select()
+        .select_from(License)
+        .join(Customer, License.customer_id == Customer.id)
+        .join(Product, License.product_id == Product.id)
+        .filter(_owner_filter(customer_id, product_id))
+        .order_by(License.end_date, License.id)
+        .offset((page - 1) * page_size)
+        .limit(page_size + 1)
+    )
+    rows = RELATED_LICENSE.all(db, stmt)
+    return rows[:page_size], len(rows) > page_size
+
+
+def license_summary(
+    db: Session,
+    customer_id: int | None = None,
+    product_id: int | None = None,
+    today: date | None = None,
+) -> dict:
+    """Gesamt, aktiv, bald ablaufend und abgelaufen in einer Abfrage."""
+    today = today or date.today()
+    limit_date = today + timedelta(days=EXPIRING_DAYS)
+
+    is_active = License.status == "active"
+    row = (
+        db.query(
+            func.count(License.id).label("total"),
+            func.coalesce(func.sum(case((is_active, 1), else_=0)), 0).label("active"),
+            func.coalesce(
+                func.sum(
+                    case(
+                        (is_active & (License.end_date >= today) & (License.end_date <= limit_date), 1),
+                        else_=0,
+                    )
+                ),
+                0,
+            ).label("expiring"),
+            func.coalesce(func.sum(case((License.end_date < today, 1), else_=0)), 0).label("expired"),
+        )
+        .filter(_owner_filter(customer_id, product_id))
+        .one()
+    )
+    return {
+        "total": row.total,
+        "active": row.active,
+        "expiring": row.expiring,
+        "expired": row.expired,
+    }
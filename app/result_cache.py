@@ -0,0 +1,92 @@
+"""LRU-Cache für Abfrageergebnisse mit Invalidierung über Tabellenversionen.
+
+Jeder Eintrag merkt sich den Versionsstand (``versions.current``) der Tabellen, aus
+denen er stammt. Weicht der beim Lesen ab, gilt der Eintrag als veraltet. Begrenzt wird
+nach Anzahl und/oder geschätztem Speicherbedarf. Alle Caches registrieren sich in
+``CACHES`` und erscheinen unter /admin/metrics.
+"""
+import sys
+import threading
+from collections import OrderedDict
+
+from . import versions
+
+CACHES: dict[str, "ResultCache"] = {}
+
+
+def estimate_row_size(row) -> int:
+    return sys.getsizeof(row) + sum(sys.getsizeof(value) for value in row)
+
+
+def estimate_size(rows) -> int:
+    """Grobe Schätzung des Speicherbedarfs einer Liste von Tupeln in Bytes."""
+    return sys.getsizeof(rows) + sum(estimate_row_size(row) for row in rows)
+
+
+class ResultCache:
+    def __init__(self, name: str, tables: tuple, max_entries: int | None = None, max_bytes: int | None = None):
+        self.name = name
+        self.tables = tables
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict = OrderedDict()  # key -> (version, size, value)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        CACHES[name] = self
+
+    def version(self) -> tuple:
+        return versions.current(*self.tables)
+
+    def get(self, key, version: tuple):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != version:
+                if entry is not None:
+                    self._drop(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[2]
+
+    def put(self, key, version: tuple, value, size: int = 0):
+        if self.max_bytes is not None and size > self.max_bytes:
+            return  # einzelnes Ergebnis größer als der ganze Cache
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (version, size, value)
+            self._bytes += size
+            while self._entries and (
+                (self.max_entries is not None and len(self._entries) > self.max_entries)
+                or (self.max_bytes is not None and self._bytes > self.max_bytes)
+            ):
+                oldest = next(iter(self._entries))
+                self._drop(oldest)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def _drop(self, key):
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else None,
+            }
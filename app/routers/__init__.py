@@ -1 +1 @@
-from . import auth, dashboard, customers, products, licenses, admin_users
+from . import auth, dashboard, customers, products, licenses, admin_users, admin_metrics, admin_profiles, audit, events, reconciliation
@@ -0,0 +1,27 @@
+from fastapi import APIRouter, Request, Depends
+from fastapi.responses import HTMLResponse
+
+from app.deps import require_admin
+from app.models import User
+from app.ratelimit import LIMITERS, shedder
+from app.result_cache import CACHES
+from app.ui import templates
+
+router = APIRouter(prefix="/admin", tags=["admin-metrics"])
+
+
+@router.get("/metrics", response_class=HTMLResponse)
+async def admin_metrics(
+    request: Request,
+    admin_user: User = Depends(require_admin),
+):
+    caches = {name: cache.stats() for name, cache in sorted(CACHES.items())}
+    return templates.TemplateResponse(
+        "admin_metrics.html",
+        {
+            "request": request,
+            "caches": caches,
+            "limiters": {name: limiter.stats() for name, limiter in LIMITERS.items()},
+            "load": shedder.stats(),
+        },
+    )
@@ -0,0 +1,88 @@
+import json
+
+from fastapi import APIRouter, Request, Depends, HTTPException
+from fastapi.responses import HTMLResponse, PlainTextResponse
+from sqlalchemy.orm import Session
+
+from app.deps import get_db, require_admin
+from app.models import RequestProfile, User
+from app.profiling import PROFILE_SAMPLE_RATE, call_tree
+from app.ui import templates
+
+router = APIRouter(prefix="/admin/profiles", tags=["admin-profiles"])
+
+PAGE_SIZE = 50
+
+
+def _get_profile(db: Session, profile_id: int) -> RequestProfile:
+    profile = db.query(RequestProfile).filter(RequestProfile.id == profile_id).first()
+    if not profile:
+        raise HTTPException(status_code=404, detail="Profil nicht gefunden")
+    return profile
+
+
+@router.get("", response_class=HTMLResponse)
+async def profiles_list(
+    request: Request,
+    db: Session = Depends(get_db),
+    admin_user: User = Depends(require_admin),
+):
+    # Listenansicht ohne die großen JSON-Spalten
+    profiles = (
+        db.query(
+            RequestProfile.id,
+            RequestProfile.created_at,
+            RequestProfile.method,
+            RequestProfile.path,
+            RequestProfile.route,
+            RequestProfile.status_code,
+            RequestProfile.username,
+            RequestProfile.trigger,
+            RequestProfile.duration_ms,
+            RequestProfile.sql_count,
+            RequestProfile.sql_ms,
+        )
+        .order_by(RequestProfile.id.desc())
+        .limit(PAGE_SIZE)
+        .all()
+    )
+    return templates.TemplateResponse(
+        "admin_profiles.html",
+        {"request": request, "profiles": profiles, "sample_rate": PROFILE_SAMPLE_RATE},
+    )
+
+
+@router.get("/{profile_id}", response_class=HTMLResponse)
+async def profile_detail(
+    profile_id: int,
+    request: Request,
+    db: Session = Depends(get_db),
+    admin_user: User = Depends(require_admin),
+):
+    profile = _get_profile(db, profile_id)
+    statements = json.loads(profile.statements)
+    return templates.TemplateResponse(
+        "admin_profile_detail.html",
+        {
+            "request": request,
+            "profile": profile,
+            "tree": call_tree(json.loads(profile.stacks)),
+            "statements": statements,
+            "slowest": sorted(statements, key=lambda s: -s[1])[:10],
+        },
+    )
+
+
+@router.get("/{profile_id}/folded")
+async def profile_folded(
+    profile_id: int,
+    db: Session = Depends(get_db),
+    admin_user: User = Depends(require_admin),
+):
+    """Stacks im Folded-Format, z.B. für flamegraph.pl oder speedscope."""
+    profile = _get_profile(db, profile_id)
+    lines = [f"{stack} {count}" for stack, count in json.loads(profile.stacks).items()]
+    return PlainTextResponse(
+        "\n".join(lines) + "\n",
+        headers={"Content-Disposition": f'attachment; filename="profile-{profile_id}.folded"'},
+    )
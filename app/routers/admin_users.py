@@ -2,6 +2,7 @@ from fastapi import APIRouter, Request, Depends, Form, HTTPException
 from fastapi.responses import HTMLResponse, RedirectResponse
 from sqlalchemy.orm import Session
 
+from app import sessions
 from app.deps import get_db, require_admin
 from app.models import User
 from app.security import hash_password
@@ -40,6 +41,7 @@ async def admin_user_create(
     password: str = Form(...),
     role: str = Form("user"),
     is_active: int = Form(1),
+    email: str = Form(""),
     db: Session = Depends(get_db),
     admin_user: User = Depends(require_admin),
 ):
@@ -51,6 +53,7 @@ async def admin_user_create(
         password_hash=hash_password(password),
         role=role,
         is_active=is_active,
+        email=email or None,
     )
     db.add(user)
     db.commit()
@@ -80,6 +83,7 @@ async def admin_user_update(
     username: str = Form(...),
     role: str = Form("user"),
     is_active: int = Form(1),
+    email: str = Form(""),
     db: Session = Depends(get_db),
     admin_user: User = Depends(require_admin),
 ):
@@ -94,8 +98,14 @@ async def admin_user_update(
     user.username = username
     user.role = role
     user.is_active = is_active
+    user.email = email or None
 
     db.commit()
+
+    # gesperrte Benutzer sofort abmelden
+    if is_active != 1:
+        sessions.backend.delete_user(user_id)
+
     return RedirectResponse(url="/admin/users", status_code=303)
 
 
@@ -130,3 +140,17 @@ async def admin_user_reset_pw(
     user.password_hash = hash_password(password)
     db.commit()
     return RedirectResponse(url="/admin/users", status_code=303)
+
+
+@router.post("/users/{user_id}/sessions/delete")
+async def admin_user_sessions_delete(
+    user_id: int,
+    db: Session = Depends(get_db),
+    admin_user: User = Depends(require_admin),
+):
+    user = db.query(User).filter(User.id == user_id).first()
+    if not user:
+        raise HTTPException(status_code=404, detail="Benutzer nicht gefunden")
+
+    sessions.backend.delete_user(user_id)
+    return RedirectResponse(url="/admin/users", status_code=303)
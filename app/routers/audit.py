@@ -0,0 +1,76 @@
+import json
+
+from fastapi import APIRouter, Request, Depends, HTTPException
+from fastapi.responses import HTMLResponse
+from sqlalchemy.orm import Session
+
+from app.audit import AUDITED_MODELS
+from app.deps import get_db, get_current_user
+from app.models import AuditLog, User
+from app.ui import templates
+
+router = APIRouter(prefix="/history", tags=["audit"])
+
+PAGE_SIZE = 50
+
+ENTITY_TYPES = set(AUDITED_MODELS.values())
+
+# Rücksprung-Links auf die Detailseiten
+ENTITY_URLS = {
+    "license": "/licenses/{id}",
+    "customer": "/customers/{id}",
+    "product": "/products/{id}",
+    "user": "/admin/users/{id}/edit",
+}
+
+
+@router.get("/{entity_type}/{entity_id}", response_class=HTMLResponse)
+async def entity_history(
+    entity_type: str,
+    entity_id: int,
+    request: Request,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    if entity_type not in ENTITY_TYPES:
+        raise HTTPException(status_code=404, detail="Unbekannter Typ")
+    if entity_type == "user" and current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Nicht genügend Rechte")
+
+    try:
+        page = max(int(request.query_params.get("page", 1)), 1)
+    except ValueError:
+        page = 1
+
+    # nutzt ix_audit_log_entity (entity_type, entity_id, id)
+    rows = (
+        db.query(AuditLog)
+        .filter(AuditLog.entity_type == entity_type, AuditLog.entity_id == entity_id)
+        .order_by(AuditLog.id.desc())
+        .offset((page - 1) * PAGE_SIZE)
+        .limit(PAGE_SIZE + 1)
+        .all()
+    )
+    has_next = len(rows) > PAGE_SIZE
+    entries = [
+        {
+            "created_at": row.created_at,
+            "username": row.username,
+            "action": row.action,
+            "changes": json.loads(row.changes) if row.changes else {},
+        }
+        for row in rows[:PAGE_SIZE]
+    ]
+
+    return templates.TemplateResponse(
+        "audit_history.html",
+        {
+            "request": request,
+            "entity_type": entity_type,
+            "entity_id": entity_id,
+            "entity_url": ENTITY_URLS[entity_type].format(id=entity_id),
+            "entries": entries,
+            "page": page,
+            "has_next": has_next,
+        },
+    )
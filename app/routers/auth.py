@@ -46,6 +46,7 @@ async def login_submit(
     request.session["login_at"] = now.isoformat()
     request.session["last_seen"] = now.isoformat()
     request.session["role"] = user.role
+    request.session["username"] = user.username
 
     return RedirectResponse(url="/", status_code=303)
 
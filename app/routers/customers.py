@@ -4,7 +4,11 @@ from sqlalchemy import or_
 from sqlalchemy.orm import Session
 
 from app.deps import get_db, get_current_user
-from app.models import Customer, User
+from app.related_licenses import license_page, license_summary
+from app.search_index import customer_index, index_customer
+from app.projections import CUSTOMER_LIST
+from app.streaming import STREAMING_LISTS, stream_template
+from app.models import ArchivedLicense, Customer, User
 from app.ui import templates
 
 router = APIRouter(prefix="/customers", tags=["customers"])
@@ -18,11 +22,11 @@ async def customers_list(
 ):
     q = request.query_params.get("q")
 
-    query = db.query(Customer).order_by(Customer.name)
+    stmt = CUSTOMER_LIST.select().order_by(Customer.name)
 
     if q:
         pattern = f"%{q}%"
-        query = query.filter(
+        stmt = stmt.filter(
             or_(
                 Customer.name.ilike(pattern),
                 Customer.customer_number.ilike(pattern),
@@ -31,13 +35,29 @@ async def customers_list(
             )
         )
 
-    customers = query.all()
+    if STREAMING_LISTS:
+        return stream_template(
+            "customers_list.html",
+            {"request": request, "customers": CUSTOMER_LIST.stream(stmt), "q": q},
+        )
+
+    customers = CUSTOMER_LIST.all(db, stmt)
     return templates.TemplateResponse(
         "customers_list.html",
         {"request": request, "customers": customers, "q": q},
     )
 
 
+@router.get("/autocomplete")
+def customer_autocomplete(
+    request: Request,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Treffer für das Typeahead-Feld: Name oder Kundennummer."""
+    return customer_index.search(db, request.query_params.get("q", ""))
+
+
 @router.get("/new", response_class=HTMLResponse)
 async def customer_new_form(
     request: Request,
@@ -70,6 +90,7 @@ async def customer_create(
     )
     db.add(customer)
     db.commit()
+    index_customer(customer)
     return RedirectResponse(url="/customers", status_code=303)
 
 
@@ -84,9 +105,24 @@ async def customer_detail(
     if not customer:
         raise HTTPException(status_code=404, detail="Kunde nicht gefunden")
 
+    try:
+        page = max(int(request.query_params.get("page", 1)), 1)
+    except ValueError:
+        page = 1
+
+    licenses, has_next = license_page(db, page, customer_id=customer_id)
+    summary = license_summary(db, customer_id=customer_id)
+
     return templates.TemplateResponse(
         "customer_detail.html",
-        {"request": request, "customer": customer},
+        {
+            "request": request,
+            "customer": customer,
+            "licenses": licenses,
+            "summary": summary,
+            "page": page,
+            "has_next": has_next,
+        },
     )
 
 
@@ -131,6 +167,7 @@ async def customer_update(
     customer.notes = notes or None
 
     db.commit()
+    index_customer(customer)
     return RedirectResponse(url=f"/customers/{customer_id}", status_code=303)
 
 
@@ -144,6 +181,9 @@ async def customer_delete(
     if not customer:
         raise HTTPException(status_code=404, detail="Kunde nicht gefunden")
 
+    # ondelete=CASCADE greift unter SQLite nicht, archivierte Lizenzen selbst löschen
+    db.query(ArchivedLicense).filter(ArchivedLicense.customer_id == customer_id).delete(synchronize_session=False)
     db.delete(customer)
     db.commit()
+    customer_index.remove(customer_id)
     return RedirectResponse(url="/customers", status_code=303)
@@ -0,0 +1,49 @@
+import asyncio
+import json
+
+from fastapi import APIRouter, Request, Depends
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+
+from app.deps import get_db, get_current_user
+from app.events import broker
+from app.models import User
+
+router = APIRouter(tags=["events"])
+
+HEARTBEAT_SECONDS = 15
+
+
+@router.get("/events")
+async def events_stream(
+    request: Request,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Server-Sent Events für Dashboard und Lizenzliste."""
+    # DB-Verbindung sofort zurückgeben, der Stream bleibt lange offen
+    db.close()
+
+    queue = broker.subscribe()
+
+    async def stream():
+        try:
+            yield "retry: 5000\n\n"
+            while True:
+                try:
+                    message = await asyncio.wait_for(queue.get(), HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": ping\n\n"
+                    continue
+                if message is None:
+                    return
+                name, payload = message
+                yield f"event: {name}\ndata: {json.dumps(payload)}\n\n"
+        finally:
+            broker.unsubscribe(queue)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
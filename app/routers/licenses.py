@@ -1,17 +1,41 @@
-from datetime import date, timedelta
+import asyncio
+import csv
+import io
+from datetime import date
 
 from fastapi import APIRouter, Request, Depends, Form, HTTPException
-from fastapi.responses import HTMLResponse, RedirectResponse
-from sqlalchemy import or_
+from fastapi.responses import HTMLResponse, RedirectResponse, StreamingResponse
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
+from app.database import SessionLocal
 from app.deps import get_db, get_current_user
-from app.models import License, Customer, Product, User
+from app.facets import facet_counts
+from app.filters import LicenseFilters, apply_license_filters
+from app.license_keys import MAX_BULK_LICENSES, issue_licenses
+from app.license_list import cached_license_rows, license_rows, stream_license_rows
+from app.models import ArchivedLicense, License, Customer, Product, User
+from app.streaming import STREAMING_LISTS, run_in_session, stream_template
 from app.ui import templates
 
 router = APIRouter(prefix="/licenses", tags=["licenses"])
 
 
+def _commit_license(db: Session, license_key: str | None):
+    # Schlüssel archivierter Lizenzen bleiben vergeben, wie bei der Bulk-Vergabe
+    try:
+        archived = license_key and db.query(ArchivedLicense.id).filter(
+            ArchivedLicense.license_key == license_key
+        ).first()
+        if not archived:
+            db.commit()
+            return
+    except IntegrityError:
+        pass
+    db.rollback()
+    raise HTTPException(status_code=400, detail="Lizenzschlüssel ist bereits vergeben")
+
+
 @router.get("", response_class=HTMLResponse)
 async def licenses_list(
     request: Request,
@@ -26,75 +50,103 @@ async def licenses_list(
     product_id = params.get("product_id")
     q = params.get("q")
 
+    filters = LicenseFilters.from_params(params)
+    today = date.today()
+
+    # Auswahl-Felder sind Typeahead, nur die aktuell gewählten Einträge laden
+    selected_customer = None
+    if filters.customer_id is not None:
+        selected_customer = db.query(Customer).filter(Customer.id == filters.customer_id).first()
+    selected_product = None
+    if filters.product_id is not None:
+        selected_product = db.query(Product).filter(Product.id == filters.product_id).first()
+
+    context = {
+        "request": request,
+        "expiring": expiring,
+        "status": status,
+        "customer_id": customer_id,
+        "product_id": product_id,
+        "q": q,
+        "include_archive": filters.include_archive,
+        "selected_customer": selected_customer,
+        "selected_product": selected_product,
+    }
+
+    if STREAMING_LISTS:
+        # Cache-Treffer normal rendern (synchrones Jinja ist schneller), sonst Kopf
+        # sofort senden und Zeilen nachstreamen
+        licenses = cached_license_rows(filters, today)
+        if licenses is None:
+            # Facetten laufen parallel, das Template wartet erst bei der ersten Verwendung
+            facets_task = asyncio.ensure_future(run_in_session(facet_counts, filters, today))
+            context["load_facets"] = lambda: facets_task
+            context["licenses"] = stream_license_rows(filters, today)
+            return stream_template("licenses_list.html", context)
+    else:
+        licenses = license_rows(db, filters, today)
+
+    context["licenses"] = licenses
+    context["facets"] = facet_counts(db, filters, today)
+    return templates.TemplateResponse("licenses_list.html", context)
+
+
+@router.get("/export")
+async def licenses_export(
+    request: Request,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """CSV-Export mit denselben Filtern wie die Liste."""
+    filters = LicenseFilters.from_params(request.query_params)
     today = date.today()
 
-    query = db.query(License).join(Customer).join(Product)
+    def rows():
+        buf = io.StringIO()
+        writer = csv.writer(buf, delimiter=";")
+        writer.writerow([
+            "Kundennummer", "Kunde", "Produkt", "Lizenzschlüssel", "Sitze", "Startdatum",
+            "Enddatum", "Intervall", "Preis", "Status", "Archiviert",
+        ])
+        # eigene Session: die Request-Session ist beim Streamen schon geschlossen
+        with SessionLocal() as export_db:
+            yield from _export_rows(export_db, filters, today, writer, buf)
+        yield buf.getvalue()
+
+    return StreamingResponse(
+        rows(),
+        media_type="text/csv; charset=utf-8",
+        headers={"Content-Disposition": 'attachment; filename="lizenzen.csv"'},
+    )
 
-    # Ablauf-Filter
-    if expiring in ("30", "60", "90"):
-        days = int(expiring)
-        limit_date = today + timedelta(days=days)
-        query = query.filter(
-            License.end_date != None,
-            License.end_date >= today,
-            License.end_date <= limit_date,
-        )
-    elif expiring == "expired":
-        query = query.filter(
-            License.end_date != None,
-            License.end_date < today,
-        )
 
-    # Status
-    if status and status != "all":
-        query = query.filter(License.status == status)
-
-    # Kunde / Produkt
-    if customer_id:
-        try:
-            cid = int(customer_id)
-            query = query.filter(License.customer_id == cid)
-        except ValueError:
-            pass
-
-    if product_id:
-        try:
-            pid = int(product_id)
-            query = query.filter(License.product_id == pid)
-        except ValueError:
-            pass
-
-    # Textsuche
-    if q:
-        pattern = f"%{q}%"
-        query = query.filter(
-            or_(
-                License.license_key.ilike(pattern),
-                Customer.name.ilike(pattern),
-                Product.name.ilike(pattern),
-                License.notes.ilike(pattern),
+def _export_rows(db: Session, filters: LicenseFilters, today: date, writer, buf):
+    for model in filters.license_models():
+        query = (
+            db.query(
+                Customer.customer_number,
+                Customer.name,
+                Product.name,
+                model.license_key,
+                model.seats,
+                model.start_date,
+                model.end_date,
+                model.interval,
+                model.price,
+                model.status,
             )
+            .select_from(model)
+            .join(Customer, model.customer_id == Customer.id)
+            .join(Product, model.product_id == Product.id)
+            .order_by(model.id)
         )
-
-    licenses = query.all()
-
-    customers = db.query(Customer).order_by(Customer.name).all()
-    products = db.query(Product).order_by(Product.name).all()
-
-    return templates.TemplateResponse(
-        "licenses_list.html",
-        {
-            "request": request,
-            "licenses": licenses,
-            "expiring": expiring,
-            "status": status,
-            "customer_id": customer_id,
-            "product_id": product_id,
-            "q": q,
-            "customers": customers,
-            "products": products,
-        },
-    )
+        query = apply_license_filters(query, filters, today, model=model)
+        for row in query.yield_per(1000):
+            writer.writerow([*("" if v is None else v for v in row), "ja" if model.is_archived else ""])
+            if buf.tell() > 65536:
+                yield buf.getvalue()
+                buf.seek(0)
+                buf.truncate()
 
 
 @router.get("/new", response_class=HTMLResponse)
@@ -103,15 +155,10 @@ async def license_new_form(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
-    customers = db.query(Customer).order_by(Customer.name).all()
-    products = db.query(Product).order_by(Product.name).all()
-
     return templates.TemplateResponse(
         "license_form.html",
         {
             "request": request,
-            "customers": customers,
-            "products": products,
             "license": None,
         },
     )
@@ -148,10 +195,70 @@ async def license_create(
         notes=notes or None,
     )
     db.add(lic)
-    db.commit()
+    _commit_license(db, lic.license_key)
     return RedirectResponse(url="/licenses", status_code=303)
 
 
+@router.get("/bulk", response_class=HTMLResponse)
+async def license_bulk_form(
+    request: Request,
+    current_user: User = Depends(get_current_user),
+):
+    return templates.TemplateResponse(
+        "license_bulk_form.html",
+        {"request": request, "max_count": MAX_BULK_LICENSES},
+    )
+
+
+@router.post("/bulk", response_class=HTMLResponse)
+def license_bulk_create(
+    request: Request,
+    customer_id: int = Form(...),
+    product_id: int = Form(...),
+    count: int = Form(...),
+    seats: int | None = Form(None),
+    start_date: str = Form(""),
+    end_date: str = Form(""),
+    interval: str = Form(""),
+    price: str = Form(""),
+    status: str = Form("active"),
+    notes: str = Form(""),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    # sync: Schlüsselprüfung und Batch-Insert laufen im Threadpool
+    customer = db.query(Customer).filter(Customer.id == customer_id).first()
+    if not customer:
+        raise HTTPException(status_code=404, detail="Kunde nicht gefunden")
+
+    try:
+        keys = issue_licenses(
+            db,
+            customer_id,
+            product_id,
+            count,
+            seats=seats,
+            start_date=date.fromisoformat(start_date) if start_date else None,
+            end_date=date.fromisoformat(end_date) if end_date else None,
+            interval=interval or None,
+            price=price or None,
+            status=status or None,
+            notes=notes or None,
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+
+    return templates.TemplateResponse(
+        "license_bulk_result.html",
+        {
+            "request": request,
+            "customer": customer,
+            "product_id": product_id,
+            "keys": keys,
+        },
+    )
+
+
 @router.get("/{license_id}", response_class=HTMLResponse)
 async def license_detail(
     license_id: int,
@@ -160,6 +267,8 @@ async def license_detail(
     current_user: User = Depends(get_current_user),
 ):
     lic = db.query(License).filter(License.id == license_id).first()
+    if not lic and request.query_params.get("include_archive") == "1":
+        lic = db.query(ArchivedLicense).filter(ArchivedLicense.id == license_id).first()
     if not lic:
         raise HTTPException(status_code=404, detail="Lizenz nicht gefunden")
 
@@ -180,15 +289,10 @@ async def license_edit_form(
     if not lic:
         raise HTTPException(status_code=404, detail="Lizenz nicht gefunden")
 
-    customers = db.query(Customer).order_by(Customer.name).all()
-    products = db.query(Product).order_by(Product.name).all()
-
     return templates.TemplateResponse(
         "license_form.html",
         {
             "request": request,
-            "customers": customers,
-            "products": products,
             "license": lic,
         },
     )
@@ -225,7 +329,7 @@ async def license_update(
     lic.status = status or None
     lic.notes = notes or None
 
-    db.commit()
+    _commit_license(db, lic.license_key)
     return RedirectResponse(url=f"/licenses/{license_id}", status_code=303)
 
 
@@ -3,25 +3,57 @@ from fastapi.responses import HTMLResponse, RedirectResponse
 from sqlalchemy.orm import Session
 
 from app.deps import get_db, get_current_user
-from app.models import Product, User
+from app.license_keys import KeyFormatError, check_format
+from app.related_licenses import license_page, license_summary
+from app.search_index import index_product, product_index
+from app.models import ArchivedLicense, License, Product, User
+from app.projections import PRODUCT_LIST
 from app.ui import templates
 
 router = APIRouter(prefix="/products", tags=["products"])
 
 
+def _key_format(value: str) -> str | None:
+    value = value.strip()
+    if not value:
+        return None
+    try:
+        check_format(value)
+    except KeyFormatError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    return value
+
+
 @router.get("", response_class=HTMLResponse)
 async def product_list(
     request: Request,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
-    products = db.query(Product).order_by(Product.name).all()
+    # Lizenzanzahl per Join statt p.licenses|length (ein Lazy Load pro Produkt)
+    stmt = (
+        PRODUCT_LIST.select()
+        .outerjoin(License, License.product_id == Product.id)
+        .group_by(Product.id, Product.name, Product.category, Product.manufacturer)
+        .order_by(Product.name)
+    )
+    products = PRODUCT_LIST.all(db, stmt)
     return templates.TemplateResponse(
         "products_list.html",
         {"request": request, "products": products},
     )
 
 
+@router.get("/autocomplete")
+def product_autocomplete(
+    request: Request,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Treffer für das Typeahead-Feld: Produktname."""
+    return product_index.search(db, request.query_params.get("q", ""))
+
+
 @router.get("/new", response_class=HTMLResponse)
 async def product_new_form(
     request: Request,
@@ -39,6 +71,7 @@ async def product_create(
     category: str = Form(""),
     manufacturer: str = Form(""),
     notes: str = Form(""),
+    key_format: str = Form(""),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
@@ -47,9 +80,11 @@ async def product_create(
         category=category or None,
         manufacturer=manufacturer or None,
         notes=notes or None,
+        key_format=_key_format(key_format),
     )
     db.add(product)
     db.commit()
+    index_product(product)
     return RedirectResponse(url="/products", status_code=303)
 
 
@@ -64,9 +99,24 @@ async def product_detail(
     if not product:
         raise HTTPException(status_code=404, detail="Produkt nicht gefunden")
 
+    try:
+        page = max(int(request.query_params.get("page", 1)), 1)
+    except ValueError:
+        page = 1
+
+    licenses, has_next = license_page(db, page, product_id=product_id)
+    summary = license_summary(db, product_id=product_id)
+
     return templates.TemplateResponse(
         "product_detail.html",
-        {"request": request, "product": product},
+        {
+            "request": request,
+            "product": product,
+            "licenses": licenses,
+            "summary": summary,
+            "page": page,
+            "has_next": has_next,
+        },
     )
 
 
@@ -94,6 +144,7 @@ async def product_update(
     category: str = Form(""),
     manufacturer: str = Form(""),
     notes: str = Form(""),
+    key_format: str = Form(""),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
@@ -105,8 +156,10 @@ async def product_update(
     product.category = category or None
     product.manufacturer = manufacturer or None
     product.notes = notes or None
+    product.key_format = _key_format(key_format)
 
     db.commit()
+    index_product(product)
     return RedirectResponse(url=f"/products/{product_id}", status_code=303)
 
 
@@ -120,6 +173,9 @@ async def product_delete(
     if not product:
         raise HTTPException(status_code=404, detail="Produkt nicht gefunden")
 
+    # ondelete=CASCADE greift unter SQLite nicht, archivierte Lizenzen selbst löschen
+    db.query(ArchivedLicense).filter(ArchivedLicense.product_id == product_id).delete(synchronize_session=False)
     db.delete(product)
     db.commit()
+    product_index.remove(product_id)
     return RedirectResponse(url="/products", status_code=303)
@@ -0,0 +1,115 @@
+from fastapi import APIRouter, Request, Depends, File, Form, HTTPException, UploadFile
+from fastapi.responses import HTMLResponse, RedirectResponse
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from app.deps import get_db, require_admin
+from app.models import ReconciliationItem, ReconciliationRun, User
+from app.reconciliation import KINDS, VENDOR_FORMATS, ReconciliationError, previous_run, reconcile_file
+from app.ui import templates
+
+router = APIRouter(prefix="/reconciliation", tags=["reconciliation"])
+
+PAGE_SIZE = 50
+
+
+def _page(request: Request) -> int:
+    try:
+        return max(int(request.query_params.get("page", 1)), 1)
+    except ValueError:
+        return 1
+
+
+@router.get("", response_class=HTMLResponse)
+async def reconciliation_runs(
+    request: Request,
+    db: Session = Depends(get_db),
+    admin_user: User = Depends(require_admin),
+):
+    page = _page(request)
+    runs = (
+        db.query(ReconciliationRun)
+        .order_by(ReconciliationRun.id.desc())
+        .offset((page - 1) * PAGE_SIZE)
+        .limit(PAGE_SIZE + 1)
+        .all()
+    )
+    return templates.TemplateResponse(
+        "reconciliation_runs.html",
+        {
+            "request": request,
+            "runs": runs[:PAGE_SIZE],
+            "vendors": VENDOR_FORMATS,
+            "kinds": KINDS,
+            "page": page,
+            "has_next": len(runs) > PAGE_SIZE,
+        },
+    )
+
+
+@router.post("")
+async def reconciliation_upload(
+    vendor: str = Form(...),
+    product_id: int | None = Form(None),
+    report: UploadFile = File(...),
+    admin_user: User = Depends(require_admin),
+):
+    if vendor not in VENDOR_FORMATS:
+        raise HTTPException(status_code=400, detail="Unbekannter Hersteller")
+
+    try:
+        # CSV parsen und abgleichen blockiert, also im Threadpool
+        run_id = await run_in_threadpool(
+            reconcile_file,
+            report.file,
+            vendor,
+            filename=report.filename,
+            product_ids=[product_id] if product_id else None,
+            username=admin_user.username,
+        )
+    except ReconciliationError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    return RedirectResponse(url=f"/reconciliation/{run_id}", status_code=303)
+
+
+@router.get("/{run_id}", response_class=HTMLResponse)
+async def reconciliation_detail(
+    run_id: int,
+    request: Request,
+    db: Session = Depends(get_db),
+    admin_user: User = Depends(require_admin),
+):
+    run = db.query(ReconciliationRun).filter(ReconciliationRun.id == run_id).first()
+    if not run:
+        raise HTTPException(status_code=404, detail="Abgleich nicht gefunden")
+
+    kind = request.query_params.get("kind")
+    if kind not in KINDS:
+        kind = None
+    page = _page(request)
+
+    # nutzt ix_reconciliation_items_run (run_id, kind, id)
+    query = db.query(ReconciliationItem).filter(ReconciliationItem.run_id == run_id)
+    if kind:
+        query = query.filter(ReconciliationItem.kind == kind)
+    items = (
+        query.order_by(ReconciliationItem.id)
+        .offset((page - 1) * PAGE_SIZE)
+        .limit(PAGE_SIZE + 1)
+        .all()
+    )
+
+    return templates.TemplateResponse(
+        "reconciliation_detail.html",
+        {
+            "request": request,
+            "run": run,
+            "previous": previous_run(db, run),
+            "vendor": VENDOR_FORMATS.get(run.vendor),
+            "kinds": KINDS,
+            "kind": kind,
+            "items": items[:PAGE_SIZE],
+            "page": page,
+            "has_next": len(items) > PAGE_SIZE,
+        },
+    )
@@ -0,0 +1,83 @@
+"""Schema-Nachträge für bestehende Datenbanken.
+
+``create_all`` legt nur fehlende Tabellen an, neue Spalten oder Indizes an vorhandenen
+Tabellen ergänzt es nicht. Die hier gelisteten Spalten werden beim Start per
+``ALTER TABLE`` nachgezogen (nullable oder mit ``server_default``), die Indizes per
+``CREATE INDEX``. Beides ist idempotent.
+"""
+import logging
+
+from sqlalchemy import inspect, text
+from sqlalchemy.exc import IntegrityError, OperationalError, ProgrammingError
+
+from .models import ArchivedLicense, License, Product, ReconciliationRun, User
+
+logger = logging.getLogger(__name__)
+
+# (Modell, Spalte), in der Reihenfolge, in der sie dazugekommen sind
+ADDED_COLUMNS = [
+    (User, "email"),
+    (Product, "key_format"),
+    (ReconciliationRun, "duplicate_local"),
+]
+
+# (Modell, Spalte): Index aus der Modelldefinition (``index=True``) auf dieser Spalte
+ADDED_INDEXES = [
+    (License, "customer_id"),
+    (License, "product_id"),
+    (License, "end_date"),
+    (License, "license_key"),
+    (ArchivedLicense, "license_key"),
+]
+
+
+def _column_names(engine, table_name: str) -> set[str]:
+    return {column["name"] for column in inspect(engine).get_columns(table_name)}
+
+
+def add_missing_columns(engine):
+    preparer = engine.dialect.identifier_preparer
+    for model, name in ADDED_COLUMNS:
+        table = model.__table__
+        if name in _column_names(engine, table.name):
+            continue
+        column = table.c[name]
+        ddl = (
+            f"ALTER TABLE {preparer.format_table(table)} "
+            f"ADD COLUMN {preparer.quote(column.name)} {column.type.compile(dialect=engine.dialect)}"
+        )
+        if column.server_default is not None:
+            # bestehende Zeilen bekommen den Default, damit ist auch NOT NULL möglich
+            ddl += f" DEFAULT {column.server_default.arg}"
+            if not column.nullable:
+                ddl += " NOT NULL"
+        try:
+            with engine.begin() as conn:
+                conn.execute(text(ddl))
+        except (OperationalError, ProgrammingError):
+            # parallel startender Worker war schneller
+            if name not in _column_names(engine, table.name):
+                raise
+        logger.info("Spalte %s.%s ergänzt", table.name, name)
+
+
+def create_missing_indexes(engine):
+    for model, name in ADDED_INDEXES:
+        for index in model.__table__.indexes:
+            if [column.name for column in index.columns] != [name]:
+                continue
+            try:
+                index.create(bind=engine, checkfirst=True)
+            except IntegrityError:
+                # Unique-Index, die Daten enthalten noch Dubletten; bis zur Bereinigung nur warnen
+                logger.warning("Index %s nicht angelegt, doppelte Werte in %s", index.name, name)
+            except (OperationalError, ProgrammingError):
+                # parallel startender Worker war schneller
+                if index.name not in {i["name"] for i in inspect(engine).get_indexes(model.__tablename__)}:
+                    raise
+
+
+def upgrade(engine):
+    """Bringt eine bestehende Datenbank auf den Stand der Modelle (nach ``create_all`` aufrufen)."""
+    add_missing_columns(engine)
+    create_missing_indexes(engine)
@@ -0,0 +1,186 @@
+"""In-Memory-Suchindex für die Kunden- und Produktauswahl (Typeahead).
+
+Ab drei Zeichen werden Kandidaten über Trigramme gefunden (Teilstring-Suche),
+kürzere Eingaben laufen über eine sortierte Wortliste (Präfix-Suche). Der Index wird
+beim Start in einem Hintergrund-Thread (``warm_up``), spätestens aber beim ersten
+Zugriff aus der DB geladen und danach von den Schreib-Handlern der Kunden und Produkte
+inkrementell gepflegt.
+"""
+import bisect
+import heapq
+import logging
+import threading
+
+from sqlalchemy.orm import Session
+
+from .database import SessionLocal
+from .models import Customer, Product
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LIMIT = 20
+# Obergrenze für Teilstring-Treffer, die gerankt werden (häufige Fragmente wie "gmb")
+MAX_CANDIDATES = 500
+
+
+def _normalize(text: str) -> str:
+    return " ".join(text.lower().split())
+
+
+def _trigrams(text: str) -> set[str]:
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class PrefixIndex:
+    def __init__(self, loader):
+        self._loader = loader
+        self._loaded = False
+        self._lock = threading.Lock()
+        self._entries: dict[int, tuple[str, tuple[str, ...]]] = {}  # id -> (label, texte)
+        self._grams: dict[str, set[int]] = {}
+        self._tokens: list[tuple[str, int]] = []                     # sortiert
+
+    def _ensure_loaded(self, db: Session):
+        if self._loaded:
+            return
+        with self._lock:
+            if self._loaded:
+                return
+            for entity_id, label, texts in self._loader(db):
+                self._add(entity_id, label, texts, keep_sorted=False)
+            self._tokens.sort()
+            self._loaded = True
+
+    def _add(self, entity_id: int, label: str, texts, keep_sorted: bool = True):
+        norm = tuple(_normalize(t) for t in texts if t)
+        self._entries[entity_id] = (label, norm)
+        for text in norm:
+            for gram in _trigrams(text):
+                self._grams.setdefault(gram, set()).add(entity_id)
+            for token in set(text.split()) | {text}:
+                if keep_sorted:
+                    bisect.insort(self._tokens, (token, entity_id))
+                else:
+                    self._tokens.append((token, entity_id))
+
+    def _remove(self, entity_id: int):
+        entry = self._entries.pop(entity_id, None)
+        if entry is None:
+            return
+        for text in entry[1]:
+            for gram in _trigrams(text):
+                ids = self._grams.get(gram)
+                if ids is not None:
+                    ids.discard(entity_id)
+                    if not ids:
+                        del self._grams[gram]
+            for token in set(text.split()) | {text}:
+                pos = bisect.bisect_left(self._tokens, (token, entity_id))
+                if pos < len(self._tokens) and self._tokens[pos] == (token, entity_id):
+                    del self._tokens[pos]
+
+    def upsert(self, entity_id: int, label: str, texts):
+        with self._lock:
+            if not self._loaded:
+                return  # wird beim ersten Zugriff ohnehin vollständig geladen
+            self._remove(entity_id)
+            self._add(entity_id, label, texts)
+
+    def remove(self, entity_id: int):
+        with self._lock:
+            if self._loaded:
+                self._remove(entity_id)
+
+    def search(self, db: Session, q: str, limit: int = DEFAULT_LIMIT) -> list[dict]:
+        self._ensure_loaded(db)
+        q = _normalize(q or "")
+        if not q:
+            return []
+
+        with self._lock:
+            ids = self._prefix_ids(q, limit)
+            if len(q) >= 3 and len(ids) < limit:
+                ids |= self._substring_ids(q, MAX_CANDIDATES)
+
+            def rank(entity_id):
+                label, texts = self._entries[entity_id]
+                if any(t.startswith(q) for t in texts):
+                    score = 0
+                elif any(token.startswith(q) for t in texts for token in t.split()):
+                    score = 1
+                else:
+                    score = 2
+                return (score, label.lower(), entity_id)
+
+            best = heapq.nsmallest(limit, ids, key=rank)
+            return [{"id": entity_id, "label": self._entries[entity_id][0]} for entity_id in best]
+
+    def _prefix_ids(self, q: str, limit: int) -> set[int]:
+        ids = set()
+        pos = bisect.bisect_left(self._tokens, (q, -1))
+        while pos < len(self._tokens) and len(ids) < limit * 5:
+            token, entity_id = self._tokens[pos]
+            if not token.startswith(q):
+                break
+            ids.add(entity_id)
+            pos += 1
+        return ids
+
+    def _substring_ids(self, q: str, cap: int) -> set[int]:
+        sets = []
+        for gram in _trigrams(q):
+            ids = self._grams.get(gram)
+            if not ids:
+                return set()
+            sets.append(ids)
+        sets.sort(key=len)
+        smallest, others = sets[0], sets[1:]
+        result = set()
+        for entity_id in smallest:
+            if any(entity_id not in ids for ids in others):
+                continue
+            # Trigramme sind nur ein Vorfilter, die Reihenfolge prüft erst der Teilstring
+            if any(q in t for t in self._entries[entity_id][1]):
+                result.add(entity_id)
+                if len(result) >= cap:
+                    break
+        return result
+
+
+def customer_label(customer) -> str:
+    return f"{customer.customer_number} - {customer.name}"
+
+
+def _load_customers(db: Session):
+    for c in db.query(Customer.id, Customer.name, Customer.customer_number).yield_per(5000):
+        yield c.id, customer_label(c), (c.name, c.customer_number)
+
+
+def _load_products(db: Session):
+    for p in db.query(Product.id, Product.name).yield_per(5000):
+        yield p.id, p.name, (p.name,)
+
+
+customer_index = PrefixIndex(_load_customers)
+product_index = PrefixIndex(_load_products)
+
+
+def warm_up():
+    """Lädt beide Indizes im Hintergrund, damit der erste Typeahead-Aufruf nicht wartet."""
+    def run():
+        try:
+            with SessionLocal() as db:
+                customer_index._ensure_loaded(db)
+                product_index._ensure_loaded(db)
+        except Exception:
+            logger.exception("Suchindex konnte nicht vorgeladen werden")
+
+    threading.Thread(target=run, name="search-index", daemon=True).start()
+
+
+def index_customer(customer: Customer):
+    customer_index.upsert(customer.id, customer_label(customer), (customer.name, customer.customer_number))
+
+
+def index_product(product: Product):
+    product_index.upsert(product.id, product.name, (product.name,))
@@ -7,9 +7,12 @@ pwd_context = CryptContext(schemes=["pbkdf2_sha256"], deprecated="auto")
 # Session-Timeouts
 SESSION_IDLE_MINUTES = 30   # nach 30 Min Inaktivität ausloggen
 SESSION_MAX_HOURS = 8       # max. Sessiondauer
+SESSION_TOUCH_SECONDS = 60  # last_seen höchstens so oft in den Session-Store schreiben
 
-# Secret Key für Session-Cookies
-SECRET_KEY = os.getenv("SECRET_KEY", "CHANGE_ME_IN_PRODUCTION")
+# Session-Store: memory, db oder redis (fakeredis als lokaler Stand-in)
+SESSION_BACKEND = os.getenv("SESSION_BACKEND", "db")
+SESSION_COOKIE_SECURE = os.getenv("SESSION_COOKIE_SECURE", "0") == "1"
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
 
 
 def verify_password(plain_password: str, password_hash: str) -> bool:
@@ -0,0 +1,272 @@
+"""Serverseitige Sessions: der Cookie trägt nur eine zufällige ID, die Daten liegen im Store.
+
+Die Middleware schreibt nur, wenn sich die Session tatsächlich geändert hat, und setzt
+den Cookie nur bei einer neuen ID. Sessions lassen sich pro Benutzer zentral beenden.
+"""
+import json
+import secrets
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, select
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import MutableHeaders
+from starlette.requests import HTTPConnection
+
+from .database import engine, read_engine
+from .models import UserSession
+from .security import REDIS_URL, SESSION_BACKEND, SESSION_COOKIE_SECURE, SESSION_MAX_HOURS
+
+SESSION_TTL_SECONDS = SESSION_MAX_HOURS * 3600
+
+
+class ServerSession(dict):
+    """Session-Dict, das sich Änderungen merkt."""
+
+    def __init__(self, data=None):
+        super().__init__(data or {})
+        self.modified = False
+
+    def __setitem__(self, key, value):
+        self.modified = True
+        super().__setitem__(key, value)
+
+    def __delitem__(self, key):
+        self.modified = True
+        super().__delitem__(key)
+
+    def clear(self):
+        self.modified = True
+        super().clear()
+
+    def pop(self, *args):
+        self.modified = True
+        return super().pop(*args)
+
+    def update(self, *args, **kwargs):
+        self.modified = True
+        super().update(*args, **kwargs)
+
+    def setdefault(self, key, default=None):
+        self.modified = True
+        return super().setdefault(key, default)
+
+
+class MemorySessionBackend:
+    """Nur für einen einzelnen Prozess, Sessions gehen beim Neustart verloren."""
+
+    def __init__(self, ttl: int = SESSION_TTL_SECONDS):
+        self.ttl = ttl
+        self._data: dict[str, tuple[float, dict]] = {}
+        self._by_user: dict[int, set[str]] = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def load(self, sid: str) -> dict | None:
+        with self._lock:
+            entry = self._data.get(sid)
+            if entry is None:
+                return None
+            expires, data = entry
+            if expires < time.monotonic():
+                self._drop(sid)
+                return None
+            return dict(data)
+
+    def save(self, sid: str, data: dict):
+        with self._lock:
+            self._drop(sid)
+            self._data[sid] = (time.monotonic() + self.ttl, dict(data))
+            if data.get("user_id") is not None:
+                self._by_user[data["user_id"]].add(sid)
+
+    def delete(self, sid: str):
+        with self._lock:
+            self._drop(sid)
+
+    def delete_user(self, user_id: int) -> int:
+        with self._lock:
+            sids = list(self._by_user.get(user_id, ()))
+            for sid in sids:
+                self._drop(sid)
+            return len(sids)
+
+    def _drop(self, sid: str):
+        entry = self._data.pop(sid, None)
+        if entry is not None:
+            user_id = entry[1].get("user_id")
+            sids = self._by_user.get(user_id)
+            if sids is not None:
+                sids.discard(sid)
+                if not sids:
+                    del self._by_user[user_id]
+
+
+class DatabaseSessionBackend:
+    """Sessions in der Tabelle ``user_sessions``, überlebt Neustarts und mehrere Worker."""
+
+    def __init__(self, ttl: int = SESSION_TTL_SECONDS):
+        self.ttl = ttl
+        self.table = UserSession.__table__
+
+    def load(self, sid: str) -> dict | None:
+        with read_engine.connect() as conn:
+            row = conn.execute(
+                select(self.table.c.data).where(
+                    self.table.c.id == sid,
+                    self.table.c.expires_at > datetime.utcnow(),
+                )
+            ).first()
+        return json.loads(row.data) if row else None
+
+    def save(self, sid: str, data: dict):
+        values = {
+            "user_id": data.get("user_id"),
+            "data": json.dumps(data),
+            "expires_at": datetime.utcnow() + timedelta(seconds=self.ttl),
+        }
+        with engine.begin() as conn:
+            updated = conn.execute(
+                self.table.update().where(self.table.c.id == sid).values(**values)
+            ).rowcount
+            if not updated:
+                conn.execute(self.table.insert().values(id=sid, **values))
+
+    def delete(self, sid: str):
+        with engine.begin() as conn:
+            conn.execute(delete(self.table).where(self.table.c.id == sid))
+
+    def delete_user(self, user_id: int) -> int:
+        with engine.begin() as conn:
+            return conn.execute(delete(self.table).where(self.table.c.user_id == user_id)).rowcount
+
+    def purge_expired(self):
+        with engine.begin() as conn:
+            conn.execute(delete(self.table).where(self.table.c.expires_at <= datetime.utcnow()))
+
+
+class RedisSessionBackend:
+    """Redis oder ein kompatibler Server; ``fakeredis`` dient als lokaler Stand-in."""
+
+    prefix = "lm:session:"
+    user_prefix = "lm:user_sessions:"
+
+    def __init__(self, client, ttl: int = SESSION_TTL_SECONDS):
+        self.client = client
+        self.ttl = ttl
+
+    def load(self, sid: str) -> dict | None:
+        raw = self.client.get(self.prefix + sid)
+        return json.loads(raw) if raw else None
+
+    def save(self, sid: str, data: dict):
+        pipe = self.client.pipeline()
+        pipe.setex(self.prefix + sid, self.ttl, json.dumps(data))
+        if data.get("user_id") is not None:
+            user_key = f"{self.user_prefix}{data['user_id']}"
+            pipe.sadd(user_key, sid)
+            pipe.expire(user_key, self.ttl)
+        pipe.execute()
+
+    def delete(self, sid: str):
+        self.client.delete(self.prefix + sid)
+
+    def delete_user(self, user_id: int) -> int:
+        user_key = f"{self.user_prefix}{user_id}"
+        sids = [s.decode() if isinstance(s, bytes) else s for s in self.client.smembers(user_key)]
+        if sids:
+            self.client.delete(*(self.prefix + sid for sid in sids))
+        self.client.delete(user_key)
+        return len(sids)
+
+
+def create_backend(name: str = SESSION_BACKEND):
+    if name == "memory":
+        return MemorySessionBackend()
+    if name == "db":
+        return DatabaseSessionBackend()
+    if name == "redis":
+        try:
+            import redis
+        except ImportError as exc:
+            raise RuntimeError("SESSION_BACKEND=redis benötigt das Paket 'redis'") from exc
+        return RedisSessionBackend(redis.Redis.from_url(REDIS_URL))
+    if name == "fakeredis":
+        try:
+            import fakeredis
+        except ImportError as exc:
+            raise RuntimeError(
+                "SESSION_BACKEND=fakeredis benötigt das Paket 'fakeredis' (requirements-dev.txt)"
+            ) from exc
+        return RedisSessionBackend(fakeredis.FakeRedis())
+    raise RuntimeError(f"Unbekanntes SESSION_BACKEND: {name}")
+
+
+backend = create_backend()
+
+
+class ServerSessionMiddleware:
+    """Ersetzt Starlettes Cookie-SessionMiddleware, ``request.session`` bleibt gleich nutzbar."""
+
+    def __init__(
+        self,
+        app,
+        backend,
+        session_cookie: str = "lm_session",
+        max_age: int = SESSION_TTL_SECONDS,
+        https_only: bool = SESSION_COOKIE_SECURE,
+    ):
+        self.app = app
+        self.backend = backend
+        self.session_cookie = session_cookie
+        self.max_age = max_age
+        self.security_flags = "httponly; samesite=lax"
+        if https_only:
+            self.security_flags += "; secure"
+        # Memory-Backend blockiert nicht, alle anderen gehen in den Threadpool
+        self._blocking = not isinstance(backend, MemorySessionBackend)
+
+    async def _call(self, func, *args):
+        if self._blocking:
+            return await run_in_threadpool(func, *args)
+        return func(*args)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] not in ("http", "websocket"):
+            await self.app(scope, receive, send)
+            return
+
+        connection = HTTPConnection(scope)
+        sid = connection.cookies.get(self.session_cookie)
+        data = await self._call(self.backend.load, sid) if sid else None
+        if data is None:
+            sid = None
+
+        session = ServerSession(data)
+        scope["session"] = session
+        initial_user = session.get("user_id")
+
+        async def send_wrapper(message):
+            nonlocal sid
+            if message["type"] == "http.response.start" and session.modified:
+                headers = MutableHeaders(scope=message)
+                if not session:
+                    if sid:
+                        await self._call(self.backend.delete, sid)
+                        headers.append("Set-Cookie", self._cookie("null", expire=True))
+                else:
+                    # neue ID bei neuer Session und nach dem Login (Session Fixation)
+                    if sid is None or session.get("user_id") != initial_user:
+                        if sid:
+                            await self._call(self.backend.delete, sid)
+                        sid = secrets.token_urlsafe(32)
+                        headers.append("Set-Cookie", self._cookie(sid))
+                    await self._call(self.backend.save, sid, dict(session))
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+
+    def _cookie(self, value: str, expire: bool = False) -> str:
+        lifetime = "expires=Thu, 01 Jan 1970 00:00:00 GMT" if expire else f"Max-Age={self.max_age}"
+        return f"{self.session_cookie}={value}; path=/; {lifetime}; {self.security_flags}"
@@ -0,0 +1,56 @@
+// Live-Updates per Server-Sent Events (/events) für Dashboard und Lizenzliste
+(function () {
+  var stats = document.querySelectorAll("[data-stat]");
+  var table = document.querySelector("[data-live-licenses]");
+  if (!stats.length && !table) return;
+
+  var source = new EventSource("/events");
+
+  source.addEventListener("stats", function (ev) {
+    var data = JSON.parse(ev.data);
+    stats.forEach(function (el) {
+      if (el.dataset.stat in data) el.textContent = data[el.dataset.stat];
+    });
+  });
+
+  if (!table) return;
+  var banner = document.getElementById("live-banner");
+  var bannerText = banner && banner.querySelector("[data-banner-text]");
+
+  function showBanner(text) {
+    if (!banner) return;
+    if (text && bannerText) bannerText.textContent = text;
+    banner.classList.remove("d-none");
+  }
+
+  // viele Änderungen auf einmal (Bulk-Vergabe, Archivierung) kommen nur als Hinweis
+  source.addEventListener("reload", function () {
+    showBanner("Es wurden viele Lizenzen geändert.");
+  });
+
+  // nach einem Verbindungsabbruch können Updates fehlen
+  var lost = false;
+  source.addEventListener("error", function () { lost = true; });
+  source.addEventListener("open", function () {
+    if (lost) showBanner("Die Verbindung war unterbrochen.");
+  });
+
+  source.addEventListener("license", function (ev) {
+    var data = JSON.parse(ev.data);
+    var row = table.querySelector('tr[data-license-id="' + data.id + '"]');
+
+    if (data.action === "deleted") {
+      if (row) row.remove();
+      return;
+    }
+    if (data.action === "updated" && row) {
+      row.querySelectorAll("[data-field]").forEach(function (cell) {
+        var value = data[cell.dataset.field];
+        cell.textContent = value === null || value === undefined ? "" : value;
+      });
+      return;
+    }
+    // neue Lizenz: ob sie zum aktuellen Filter passt, weiß nur der Server
+    showBanner();
+  });
+})();
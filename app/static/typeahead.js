@@ -0,0 +1,67 @@
+// Typeahead für Kunden-/Produktauswahl, siehe Makro "typeahead" in templates/macros.html
+(function () {
+  function init(box) {
+    var hidden = box.querySelector("input[type=hidden]");
+    var input = box.querySelector("input[type=text]");
+    var list = box.querySelector(".list-group");
+    var timer = null;
+    var seq = 0;
+
+    function hide() {
+      list.classList.add("d-none");
+      list.innerHTML = "";
+    }
+
+    function render(items) {
+      list.innerHTML = "";
+      items.forEach(function (item) {
+        var a = document.createElement("button");
+        a.type = "button";
+        a.className = "list-group-item list-group-item-action";
+        a.textContent = item.label;
+        a.addEventListener("mousedown", function (ev) {
+          ev.preventDefault();
+          hidden.value = item.id;
+          input.value = item.label;
+          input.classList.remove("is-invalid");
+          hide();
+        });
+        list.appendChild(a);
+      });
+      list.classList.toggle("d-none", items.length === 0);
+    }
+
+    input.addEventListener("input", function () {
+      hidden.value = "";
+      clearTimeout(timer);
+      var q = input.value.trim();
+      if (!q) {
+        hide();
+        return;
+      }
+      timer = setTimeout(function () {
+        var current = ++seq;
+        fetch(box.dataset.source + "?q=" + encodeURIComponent(q), { credentials: "same-origin" })
+          .then(function (r) { return r.ok ? r.json() : []; })
+          .then(function (items) {
+            if (current === seq) render(items);
+          });
+      }, 150);
+    });
+
+    input.addEventListener("blur", hide);
+
+    var form = box.closest("form");
+    if (form && box.hasAttribute("data-required")) {
+      form.addEventListener("submit", function (ev) {
+        if (!hidden.value) {
+          ev.preventDefault();
+          input.classList.add("is-invalid");
+          input.focus();
+        }
+      });
+    }
+  }
+
+  document.querySelectorAll(".typeahead").forEach(init);
+})();
@@ -0,0 +1,36 @@
+"""Kennzahlen fürs Dashboard, genutzt von der Seite selbst und vom Live-Update."""
+from datetime import date, timedelta
+
+from sqlalchemy.orm import Session
+
+from .models import Customer, License
+
+
+def dashboard_stats(db: Session) -> dict:
+    customers_count = db.query(Customer).count()
+    licenses_active = db.query(License).filter(License.status == "active").count()
+
+    today = date.today()
+    in_30 = today + timedelta(days=30)
+    in_90 = today + timedelta(days=90)
+
+    exp_30 = db.query(License).filter(
+        License.status == "active",
+        License.end_date != None,
+        License.end_date >= today,
+        License.end_date <= in_30,
+    ).count()
+
+    exp_90 = db.query(License).filter(
+        License.status == "active",
+        License.end_date != None,
+        License.end_date >= today,
+        License.end_date <= in_90,
+    ).count()
+
+    return {
+        "customers_count": customers_count,
+        "licenses_active": licenses_active,
+        "licenses_expiring_30": exp_30,
+        "licenses_expiring_90": exp_90,
+    }
@@ -0,0 +1,89 @@
+"""Gestreamtes Rendern großer Listenseiten.
+
+Die Templates laufen in einer async-Jinja-Umgebung (``generate_async``), die Zeilen
+kommen chunkweise über einen serverseitigen Cursor. Kopf und Filterformular sind so
+beim Browser, bevor die erste Zeile gelesen ist; der Speicherbedarf hängt nicht mehr
+von der Trefferzahl ab.
+"""
+import os
+
+import jinja2
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+
+from .database import SessionLocal
+from .ui import templates
+
+STREAMING_LISTS = os.getenv("STREAMING_LISTS", "1") == "1"
+STREAM_CHUNK_ROWS = 500
+FLUSH_BYTES = 16 * 1024
+# ``{{ flush() }}`` im Template: Puffer sofort schreiben, z.B. den Kopf vor der ersten Zeile
+FLUSH_MARKER = "\x00flush\x00"
+
+stream_env = jinja2.Environment(
+    loader=templates.env.loader,
+    autoescape=True,
+    enable_async=True,
+)
+stream_env.filters.update(templates.env.filters)
+stream_env.globals.update(templates.env.globals)
+stream_env.globals["flush"] = lambda: FLUSH_MARKER
+
+
+async def iter_rows(stmt, chunk_size: int = STREAM_CHUNK_ROWS):
+    """Liefert die Zeilen von ``stmt`` asynchron, jeder Chunk wird im Threadpool geholt."""
+    # eigene Session: die des Requests ist beim Streamen bereits geschlossen
+    db = SessionLocal()
+    try:
+        result = await run_in_threadpool(
+            db.execute, stmt.execution_options(stream_results=True, yield_per=chunk_size)
+        )
+        partitions = result.partitions(chunk_size)
+        while True:
+            chunk = await run_in_threadpool(next, partitions, None)
+            if chunk is None:
+                break
+            for row in chunk:
+                yield row
+    finally:
+        await run_in_threadpool(db.close)
+
+
+async def run_in_session(func, *args):
+    """Führt ``func(db, *args)`` im Threadpool mit eigener Session aus."""
+    def call():
+        with SessionLocal() as db:
+            return func(db, *args)
+
+    return await run_in_threadpool(call)
+
+
+async def _buffered(parts):
+    """Fasst die vielen kleinen Template-Stücke zu größeren Chunks zusammen.
+
+    Geschrieben wird ab ``FLUSH_BYTES`` und an jedem ``flush()`` im Template, also
+    bevor auf die DB gewartet wird.
+    """
+    buf = []
+    size = 0
+    async for part in parts:
+        if part == FLUSH_MARKER:
+            if buf:
+                yield "".join(buf)
+                buf, size = [], 0
+            continue
+        buf.append(part)
+        size += len(part)
+        if size >= FLUSH_BYTES:
+            yield "".join(buf)
+            buf, size = [], 0
+    if buf:
+        yield "".join(buf)
+
+
+def stream_template(name: str, context: dict) -> StreamingResponse:
+    template = stream_env.get_template(name)
+    return StreamingResponse(
+        _buffered(template.generate_async(context)),
+        media_type="text/html; charset=utf-8",
+    )
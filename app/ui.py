@@ -1,3 +1,17 @@
+from urllib.parse import urlencode
+
 from fastapi.templating import Jinja2Templates
 
 templates = Jinja2Templates(directory="app/templates")
+
+
+def urlencode_merge(params, **overrides) -> str:
+    """Query-String mit überschriebenen Parametern, z.B. für Filter- und Blätter-Links."""
+    merged = dict(params)
+    merged.update(overrides)
+    return urlencode({k: v for k, v in merged.items() if v not in (None, "")})
+
+
+templates.env.filters["urlencode_merge"] = urlencode_merge
+# nur beim gestreamten Rendern wirksam (siehe streaming.FLUSH_MARKER)
+templates.env.globals["flush"] = lambda: ""
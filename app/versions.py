@@ -0,0 +1,47 @@
+"""Versionszähler pro Tabelle, Grundlage für die Invalidierung von Ergebnis-Caches.
+
+Jeder erfolgreiche Commit, der ORM-Objekte einer Tabelle anlegt, ändert oder löscht,
+erhöht deren Zähler. Schreibzugriffe an der Session vorbei (Core-Inserts) müssen
+``bump()`` selbst aufrufen.
+"""
+import threading
+from collections import defaultdict
+
+from sqlalchemy import event
+
+from .database import SessionLocal
+
+_versions: dict[str, int] = defaultdict(int)
+_lock = threading.Lock()
+
+
+def bump(*tables: str):
+    with _lock:
+        for table in tables:
+            _versions[table] += 1
+
+
+def current(*tables: str) -> tuple:
+    with _lock:
+        return tuple(_versions[table] for table in tables)
+
+
+@event.listens_for(SessionLocal, "after_flush")
+def _collect_tables(session, flush_context):
+    touched = session.info.setdefault("touched_tables", set())
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        table = getattr(obj, "__tablename__", None)
+        if table:
+            touched.add(table)
+
+
+@event.listens_for(SessionLocal, "after_commit")
+def _bump_tables(session):
+    touched = session.info.pop("touched_tables", None)
+    if touched:
+        bump(*touched)
+
+
+@event.listens_for(SessionLocal, "after_rollback")
+def _discard_tables(session):
+    session.info.pop("touched_tables", None)
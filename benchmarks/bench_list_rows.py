@@ -0,0 +1,95 @@
+"""Benchmark: ORM-Objekte (query.all()) gegen projizierte Zeilen für die Lizenzliste.
+
+Misst Laufzeit und Spitzen-Speicher (tracemalloc) pro ROWS Lizenzen auf einer
+frischen SQLite-Datenbank.
+
+    python benchmarks/bench_list_rows.py [ROWS]
+"""
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+_db_file = os.path.join(tempfile.mkdtemp(), "bench.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{_db_file}"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database import Base, SessionLocal, engine  # noqa: E402
+from app.filters import LicenseFilters  # noqa: E402
+from app.license_list import _select  # noqa: E402
+from app.models import Customer, License, Product  # noqa: E402
+from app.projections import license_list_projection  # noqa: E402
+
+ROWS = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+CUSTOMERS = 1000
+PRODUCTS = 100
+
+
+def seed():
+    Base.metadata.create_all(bind=engine)
+    start = date(2024, 1, 1)
+    with engine.begin() as conn:
+        conn.execute(Customer.__table__.insert(), [
+            {"id": i, "customer_number": f"C-{i}", "name": f"Kunde {i}"} for i in range(1, CUSTOMERS + 1)
+        ])
+        conn.execute(Product.__table__.insert(), [
+            {"id": i, "name": f"Produkt {i}"} for i in range(1, PRODUCTS + 1)
+        ])
+        conn.execute(License.__table__.insert(), [
+            {
+                "customer_id": i % CUSTOMERS + 1,
+                "product_id": i % PRODUCTS + 1,
+                "license_key": f"KEY-{i:08d}",
+                "seats": i % 50 + 1,
+                "start_date": start,
+                "end_date": start + timedelta(days=i % 1000),
+                "status": "active",
+                "notes": "Notiz " * 40,
+            }
+            for i in range(ROWS)
+        ])
+
+
+def orm_rows():
+    # bisheriger Weg: ganze ORM-Objekte, Namen über die Relationships
+    with SessionLocal() as db:
+        rows = db.query(License).join(Customer).join(Product).order_by(License.id).all()
+        for lic in rows:
+            lic.customer.name, lic.product.name, lic.license_key, lic.end_date
+        return len(rows)
+
+
+def projected_rows():
+    filters = LicenseFilters.from_params({})
+    projection = license_list_projection(License)
+    with SessionLocal() as db:
+        rows = projection.all(db, _select(projection, License, filters, date.today()))
+        for lic in rows:
+            lic.customer_name, lic.product_name, lic.license_key, lic.end_date
+        return len(rows)
+
+
+def measure(fn):
+    tracemalloc.start()
+    started = time.perf_counter()
+    count = fn()
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return count, elapsed, peak
+
+
+def main():
+    seed()
+    print(f"{ROWS} Lizenzen, SQLite")
+    print(f"{'Variante':<12} {'Zeilen':>8} {'Zeit (s)':>10} {'Peak (MB)':>10}")
+    for name, fn in (("query.all", orm_rows), ("projektion", projected_rows)):
+        count, elapsed, peak = measure(fn)
+        print(f"{name:<12} {count:>8} {elapsed:>10.2f} {peak / 1024 / 1024:>10.1f}")
+    os.remove(_db_file)
+
+
+if __name__ == "__main__":
+    main()
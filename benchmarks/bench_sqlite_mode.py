@@ -0,0 +1,114 @@
+"""Benchmark: Standard-SQLite gegen den getunten Modus (SQLITE_TUNED=1) unter paralleler Last.
+
+Leser-Threads holen Seiten der Lizenzliste eines Kunden, Schreiber-Threads ändern Seats
+einzelner Lizenzen und committen, beides über ``SessionLocal`` wie in der App. Gemessen
+werden Operationen pro Sekunde und Fehler (z.B. "database is locked").
+
+    python benchmarks/bench_sqlite_mode.py [SEKUNDEN] [LESER] [SCHREIBER]
+
+Jeder Modus läuft in einem eigenen Prozess, weil app.database die Konfiguration beim
+Import liest.
+"""
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LICENSES = 50_000
+CUSTOMERS = 500
+
+
+def seed(path: str):
+    from app.database import Base, engine
+    from app.models import Customer, License, Product
+
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(Customer.__table__.insert(), [
+            {"id": i, "customer_number": f"C-{i}", "name": f"Kunde {i}"} for i in range(1, CUSTOMERS + 1)
+        ])
+        conn.execute(Product.__table__.insert(), [{"id": 1, "name": "Produkt"}])
+        conn.execute(License.__table__.insert(), [
+            {"customer_id": i % CUSTOMERS + 1, "product_id": 1, "license_key": f"KEY-{i}", "seats": 1, "status": "active"}
+            for i in range(LICENSES)
+        ])
+
+
+def worker(kind: str, stop: threading.Event, counts: dict, lock: threading.Lock):
+    from sqlalchemy import select, update
+
+    from app.database import SessionLocal
+    from app.models import Customer, License
+
+    ops = errors = 0
+    rnd = random.Random()
+    while not stop.is_set():
+        try:
+            with SessionLocal() as db:
+                if kind == "read":
+                    db.execute(
+                        select(License.id, License.license_key, Customer.name)
+                        .join(Customer, License.customer_id == Customer.id)
+                        .where(License.customer_id == rnd.randint(1, CUSTOMERS))
+                        .order_by(License.end_date)
+                        .limit(50)
+                    ).all()
+                else:
+                    db.execute(
+                        update(License).where(License.id == rnd.randint(1, LICENSES)).values(seats=rnd.randint(1, 100))
+                    )
+                    db.commit()
+            ops += 1
+        except Exception:
+            errors += 1
+    with lock:
+        counts[kind] += ops
+        counts[f"{kind}_errors"] += errors
+
+
+def run_mode(seconds: float, readers: int, writers: int):
+    seed(os.environ["DATABASE_URL"])
+    counts = {"read": 0, "write": 0, "read_errors": 0, "write_errors": 0}
+    lock = threading.Lock()
+    stop = threading.Event()
+    threads = [
+        threading.Thread(target=worker, args=(kind, stop, counts, lock))
+        for kind, n in (("read", readers), ("write", writers))
+        for _ in range(n)
+    ]
+    for t in threads:
+        t.start()
+    time.sleep(seconds)
+    stop.set()
+    for t in threads:
+        t.join()
+
+    mode = "getunt" if os.environ.get("SQLITE_TUNED") == "1" else "standard"
+    print(
+        f"{mode:<10} {counts['read'] / seconds:>12.0f} {counts['write'] / seconds:>12.0f} "
+        f"{counts['read_errors']:>10} {counts['write_errors']:>10}"
+    )
+
+
+def main():
+    args = sys.argv[1:4]
+    print(f"{LICENSES} Lizenzen, Leser/Schreiber: {args[1] if len(args) > 1 else 8}/{args[2] if len(args) > 2 else 2}")
+    print(f"{'Modus':<10} {'Lesen/s':>12} {'Schreiben/s':>12} {'Fehler L':>10} {'Fehler S':>10}")
+    for tuned in ("0", "1"):
+        with tempfile.TemporaryDirectory() as tmp:
+            env = dict(os.environ, DATABASE_URL=f"sqlite:///{tmp}/bench.db", SQLITE_TUNED=tuned)
+            subprocess.run([sys.executable, __file__, "--run", *args], env=env, cwd=ROOT, check=True)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "--run":
+        sys.path.insert(0, ROOT)
+        params = [float(a) for a in sys.argv[2:5]]
+        seconds, readers, writers = (params + [10, 8, 2][len(params):])[:3]
+        run_mode(seconds, int(readers), int(writers))
+    else:
+        main()